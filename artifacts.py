@@ -0,0 +1,46 @@
+# Import necessary libraries for saving debug copies of scraped pages.
+import logging  # Used for levelled progress and error messages.
+import os  # Used to build paths and create the artifacts folder.
+import re  # Used to turn a URL into a readable filename.
+from hashlib import sha256  # Used to keep filenames unique per URL.
+
+logger = logging.getLogger(__name__)
+
+# Debug dumps are off by default so the hot path never touches the disk.
+DUMP_ARTIFACTS = False
+ARTIFACTS_DIR = "artifacts"
+
+
+def configure_artifacts(enabled=False, directory=ARTIFACTS_DIR):
+    """
+    Turns saving of debug copies (raw and prettified HTML) on or off and sets where they go.
+    """
+    global DUMP_ARTIFACTS, ARTIFACTS_DIR
+    DUMP_ARTIFACTS = enabled
+    ARTIFACTS_DIR = directory
+
+
+def artifact_path(url, kind):
+    """
+    Builds a filename that is unique to the URL, e.g. 'artifacts/www-nnnow-com-men-1a2b3c4d5e6f-raw.html'.
+    """
+    # Keep a short readable part of the URL and add a hash so different URLs never collide.
+    readable = re.sub(r'[^A-Za-z0-9]+', '-', url.split('://', 1)[-1]).strip('-')[:60]
+    digest = sha256(url.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(ARTIFACTS_DIR, f"{readable}-{digest}-{kind}.html")
+
+
+def dump_artifact(url, kind, html=None, soup=None):
+    """
+    Saves a debug copy of a page if artifact dumping is enabled.
+    Pass html to save it as-is, or soup to save a prettified version.
+    """
+    if not DUMP_ARTIFACTS:
+        return None
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    path = artifact_path(url, kind)
+    with open(path, 'w', encoding='utf-8') as f:
+        # The prettify pass is only paid for when someone asked for the dump.
+        f.write(soup.prettify() if soup is not None else html)
+    logger.debug(f"Saved {kind} copy of {url} to '{path}'")
+    return path
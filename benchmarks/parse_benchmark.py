@@ -0,0 +1,75 @@
+# Compares parse time and peak memory of the different parsing paths on saved pages.
+#
+# Usage (from the project folder):
+#   python benchmarks/parse_benchmark.py file.html [more_pages.html ...] --page-type listing --repeat 5
+#
+# Save pages to benchmark with scrape_specific_url(url, "file.html") or navigate_to_page(dump_artifacts=True).
+import argparse  # Used to read the command-line options.
+import os  # Used to find the project folder.
+import sys  # Used to make the project modules importable.
+import time  # Used to time each parse.
+import tracemalloc  # Used to measure peak memory while parsing.
+
+# Make the project modules importable when the script is run from anywhere.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from site_profile import load_site_profile, DEFAULT_SITE_PROFILE  # noqa: E402
+
+# The page types a site profile has parse regions for.
+PAGE_TYPES = ('home', 'listing', 'product', 'variant')
+
+
+def available_parsers():
+    """
+    Lists the parser backends installed on this machine.
+    """
+    parsers = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        parsers.append('lxml')
+    except ImportError:
+        print("lxml is not installed; only html.parser will be benchmarked.")
+    return parsers
+
+
+def measure(html_content, parser, parse_only, repeat):
+    """
+    Parses the page repeat times and returns (best time in ms, peak memory in MB, number of tags).
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        soup = BeautifulSoup(html_content, parser, parse_only=parse_only)
+        best = min(best, time.perf_counter() - start)
+    tag_count = len(soup.find_all(True))
+
+    # Measure memory in a separate pass, because tracemalloc slows parsing down.
+    tracemalloc.start()
+    soup = BeautifulSoup(html_content, parser, parse_only=parse_only)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / (1024 * 1024), tag_count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark full vs. region-restricted parsing on saved pages.")
+    arg_parser.add_argument('pages', nargs='+', help="Saved HTML pages to parse.")
+    arg_parser.add_argument('--page-type', default='listing', choices=PAGE_TYPES, help="Which parse regions to use.")
+    arg_parser.add_argument('--site-profile', default=DEFAULT_SITE_PROFILE, help="The site profile the home and listing regions come from.")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="Timed parses per page (the best one is reported).")
+    args = arg_parser.parse_args()
+    regions = load_site_profile(args.site_profile).page_regions(args.page_type)
+
+    print(f"{'page':<30} {'parser':<12} {'mode':<10} {'parse ms':>10} {'peak MB':>10} {'tags':>8}")
+    for page in args.pages:
+        with open(page, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        for parser in available_parsers():
+            for mode, parse_only in (('full', None), ('regions', regions)):
+                parse_ms, peak_mb, tag_count = measure(html_content, parser, parse_only, args.repeat)
+                print(f"{os.path.basename(page)[:30]:<30} {parser:<12} {mode:<10} {parse_ms:>10.1f} {peak_mb:>10.1f} {tag_count:>8}")
+
+
+if __name__ == "__main__":
+    main()
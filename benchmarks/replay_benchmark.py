@@ -0,0 +1,158 @@
+# Measures the scraper's throughput offline by replaying saved pages through the real crawl code.
+#
+# Usage (from the project folder):
+#   python benchmarks/replay_benchmark.py benchmarks/fixtures                  # run and compare with the baseline
+#   python benchmarks/replay_benchmark.py benchmarks/fixtures --save-baseline  # run and save a new baseline
+#
+# The fixtures folder holds saved pages: either the home.html / file.html / temp.html files the scraper
+# produces, or a folder recorded with fetcher.RecordingFetcher (pages plus a urls.json index).
+import argparse  # Used to read the command-line options.
+import json  # Used to save and load the baseline.
+import os  # Used for paths.
+import resource  # Used to read the peak memory (RSS) of this process.
+import sys  # Used to make the project modules importable.
+import tempfile  # Used for throwaway output files.
+import time  # Used to time each stage.
+
+# Make the project modules importable when the script is run from anywhere.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detailed_product_information import read_product_page  # noqa: E402
+from fetcher import ReplayFetcher, DEFAULT_FIXTURES  # noqa: E402
+from html_parser import make_soup  # noqa: E402
+from navigator import navigate_to_page  # noqa: E402
+from site_profile import load_site_profile  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# For each metric: True if a bigger number is better.
+HIGHER_IS_BETTER = {
+    'pages_per_sec': True,
+    'products_per_sec': True,
+    'parse_ms_home': False,
+    'parse_ms_listing': False,
+    'parse_ms_product': False,
+    'peak_rss_mb': False,
+}
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident memory of this process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def benchmark_crawl(fixtures_dir, repeat, max_workers):
+    """
+    Runs the full crawl (navigate_to_page -> stream_product_data -> extract_detailed_product_info)
+    against the replayed pages and returns pages/sec and products/sec.
+    """
+    fetcher = ReplayFetcher(fixtures_dir)
+    total_seconds = 0.0
+    total_products = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        for run in range(repeat):
+            output_path = os.path.join(scratch, f"run{run}.jsonl")
+            start = time.perf_counter()
+            # The crawl's progress messages are INFO logs, which stay hidden unless logging is configured.
+            # Replayed pages come from disk, so the per-host rate limit is switched off.
+            navigate_to_page(max_workers=max_workers, output_path=output_path, json_export_path=None,
+                             seen_index_path=None, fetcher=fetcher, metrics_path=None,
+                             requests_per_second=None, state_path=None)
+            total_seconds += time.perf_counter() - start
+            with open(output_path, 'r', encoding='utf-8') as f:
+                total_products += sum(1 for line in f if line.strip())
+    return {
+        'pages_per_sec': fetcher.pages_served / total_seconds,
+        'products_per_sec': total_products / total_seconds,
+        'pages': fetcher.pages_served,
+        'products': total_products,
+    }
+
+
+def benchmark_parsing(fixtures_dir, repeat):
+    """
+    Times parsing plus extraction for each saved page type and returns milliseconds per page.
+    """
+    plan = load_site_profile()
+    fetcher = ReplayFetcher(fixtures_dir)
+    extractors = {
+        'home': lambda html: plan.find_navigation_links(make_soup(html, 'home', regions=plan.navigation_regions())),
+        'listing': lambda html: [plan.extract(node) for node in plan.find_listings(make_soup(html, 'listing', regions=plan.listing_regions()))],
+        # The JSON-LD read, the DOM fallback and the colour links, as the crawl does for every product page.
+        'product': lambda html: read_product_page('replay://product', html),
+    }
+    results = {}
+    for page_type, extract in extractors.items():
+        html_content = fetcher.fetch(f"replay://{DEFAULT_FIXTURES[page_type]}", page_type)
+        if html_content is None:
+            print(f"No saved {page_type} page in '{fixtures_dir}', skipping its parse benchmark.")
+            continue
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extract(html_content)
+        results[f"parse_ms_{page_type}"] = (time.perf_counter() - start) * 1000 / repeat
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Prints each metric next to its baseline and returns the list of metrics that got worse than the tolerance.
+    """
+    regressions = []
+    print(f"\n{'metric':<20} {'baseline':>12} {'current':>12} {'change':>9}")
+    for metric, higher_is_better in HIGHER_IS_BETTER.items():
+        if metric not in results or metric not in baseline or not baseline[metric]:
+            continue
+        change = (results[metric] - baseline[metric]) / baseline[metric]
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{metric:<20} {baseline[metric]:>12.2f} {results[metric]:>12.2f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(metric)
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Replay saved pages through the crawl and report throughput.")
+    arg_parser.add_argument('fixtures_dir', help="Folder of saved pages (home.html, file.html, temp.html or a recorded urls.json).")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="How many times to run each stage.")
+    arg_parser.add_argument('--workers', type=int, default=1, help="max_workers passed to the crawl.")
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results file.")
+    arg_parser.add_argument('--save-baseline', action='store_true', help="Save these results as the new baseline.")
+    arg_parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before a metric counts as a regression (0.2 = 20%%).")
+    args = arg_parser.parse_args()
+
+    results = {}
+    results.update(benchmark_crawl(args.fixtures_dir, args.repeat, args.workers))
+    results.update(benchmark_parsing(args.fixtures_dir, args.repeat))
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    print(f"Replayed {results['pages']} pages and {results['products']} products.")
+    for metric in HIGHER_IS_BETTER:
+        if metric in results:
+            print(f"  {metric:<20} {results[metric]:.2f}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Saved baseline to '{args.baseline}'.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet. Run again with --save-baseline to create one.")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nPerformance regressions: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
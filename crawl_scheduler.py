@@ -0,0 +1,206 @@
+# Import necessary libraries for scheduling page fetches politely and concurrently.
+import logging  # Used for levelled progress and error messages.
+import asyncio  # Runs the crawl as coroutines so many pages can be in flight at once.
+import itertools  # Used to keep first-in-first-out order among pages of equal priority.
+import random  # Used to add jitter to retry delays.
+from concurrent.futures import ThreadPoolExecutor  # Fetchers block (Selenium, requests), so they run on threads.
+from urllib.parse import urlsplit  # Used to find the host of each URL.
+from metrics import METRICS  # Records retries and rate-limit waits for the run summary.
+
+logger = logging.getLogger(__name__)
+
+# --- FRONTIER PRIORITIES ---
+# Lower numbers are fetched first. Finishing the variants and products already started
+# before opening new listing pages keeps the amount of half-done work (and memory) small.
+PAGE_PRIORITIES = {
+    'variant': 0,
+    'product': 1,
+    'listing': 2,
+    'home': 3,
+}
+
+
+class TokenBucket:
+    """
+    A token-bucket rate limiter: allows `rate` requests per second on average, with short bursts of up to `burst`.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Waits until a token is available and takes it.
+        """
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated_at is not None:
+                    # Refill the bucket for the time that passed, up to its size.
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                METRICS.observe('rate_limit_wait', wait * 1000)
+                await asyncio.sleep(wait)
+
+
+class CrawlScheduler:
+    """
+    Fetches pages for the crawl through a prioritised URL frontier.
+    Every fetch goes into the frontier; a fixed number of workers take the most urgent page,
+    wait for a token from that host's rate limiter, fetch it on a thread and hand the HTML back.
+    Failed fetches (None or an exception) are retried with exponential backoff.
+    Use it as an 'async with' block inside a running event loop.
+    """
+
+    def __init__(self, fetcher, max_concurrency=2, requests_per_second=1.0, burst=2, max_retries=3,
+                 backoff_base=2.0, max_backoff=60.0):
+        self.fetcher = fetcher
+        # How many pages may be fetched at the same time (across all hosts).
+        self.max_concurrency = max(1, max_concurrency)
+        # Politeness per host. requests_per_second=None turns rate limiting off (e.g. for replayed pages).
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        # A page is tried 1 + max_retries times before giving up.
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._buckets = {}
+        self._order = itertools.count()
+        self._frontier = None
+        self._workers = []
+        self._executor = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def start(self):
+        """
+        Starts the fetch workers. Must be called from inside the event loop.
+        """
+        self._frontier = asyncio.PriorityQueue()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='fetch')
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)]
+
+    async def close(self):
+        """
+        Stops the workers and waits for any fetch still running on a thread.
+        """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def fetch(self, url, page_type):
+        """
+        Queues a page in the frontier and waits for its HTML (None if every attempt failed).
+        """
+        return (await self.fetch_many([url], page_type))[0]
+
+    async def fetch_many(self, urls, page_type):
+        """
+        Queues several pages of the same type as one frontier entry, so a single worker fetches them
+        side by side (for example in tabs of one browser). Returns their HTML in the same order.
+        Pages that fail are retried one by one.
+        """
+        if not urls:
+            return []
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in urls]
+        self._enqueue(list(urls), page_type, futures, attempt=0)
+        return list(await asyncio.gather(*futures))
+
+    async def stream_listing(self, url, plan, batch_size=50):
+        """
+        Streams the product cards of a listing page (see Fetcher.stream_listing) as an async generator.
+        The page costs one token from its host's rate limiter. It isn't retried: if nothing comes back,
+        the caller decides what to do. The blocking reads run on a thread, so product pages keep
+        being fetched while the listing scrolls.
+        """
+        if self.requests_per_second:
+            await self._bucket_for(url).acquire()
+        batches = await asyncio.to_thread(self.fetcher.stream_listing, url, plan, batch_size)
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            try:
+                # Hands the browser back to the pool if the caller stopped early.
+                await asyncio.to_thread(batches.close)
+            except ValueError:
+                # Still running on its thread (the crawl was cancelled); it finishes on its own.
+                pass
+
+    def _enqueue(self, urls, page_type, futures, attempt):
+        priority = PAGE_PRIORITIES.get(page_type, len(PAGE_PRIORITIES))
+        self._frontier.put_nowait((priority, next(self._order), urls, page_type, futures, attempt))
+
+    def _bucket_for(self, url):
+        """
+        Returns the rate limiter of the URL's host, creating it on first use.
+        """
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+        return self._buckets[host]
+
+    def _backoff_delay(self, attempt):
+        """
+        Exponential backoff with jitter: about 2s, 4s, 8s... capped at max_backoff.
+        """
+        delay = min(self.max_backoff, self.backoff_base * (2 ** attempt))
+        return delay + random.uniform(0, self.backoff_base)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, order, urls, page_type, futures, attempt = await self._frontier.get()
+            if all(future.done() for future in futures):
+                # The caller stopped waiting (for example the crawl was cancelled).
+                continue
+            if self.requests_per_second:
+                # Every page in a batch costs one token from its host's bucket.
+                for url in urls:
+                    await self._bucket_for(url).acquire()
+            try:
+                if len(urls) == 1:
+                    results = [await loop.run_in_executor(self._executor, self.fetcher.fetch, urls[0], page_type)]
+                else:
+                    results = await loop.run_in_executor(self._executor, self.fetcher.fetch_many, urls, page_type)
+                errors = [None if html_content is not None else "no HTML came back" for html_content in results]
+            except Exception as e:
+                results = [None] * len(urls)
+                errors = [e] * len(urls)
+            for url, future, html_content, error in zip(urls, futures, results, errors):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(html_content)
+                elif attempt < self.max_retries:
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"Fetching {url} failed ({error}). Retrying in {delay:.1f}s.")
+                    METRICS.increment('fetch_retries', url=url)
+                    # Put it back in the frontier after the delay, without holding up a worker meanwhile.
+                    loop.call_later(delay, self._enqueue, [url], page_type, [future], attempt + 1)
+                else:
+                    logger.error(f"Giving up on {url} after {attempt + 1} attempts: {error}")
+                    METRICS.increment('fetch_failures', url=url)
+                    future.set_result(None)
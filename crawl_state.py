@@ -0,0 +1,155 @@
+# Import necessary libraries for saving crawl progress so an interrupted run can resume.
+import json  # Used to store the data each page needs when it is resumed.
+import sqlite3  # A small on-disk database that ships with Python.
+import threading  # Used so several workers can share one state file safely.
+import time  # Used to timestamp each status change.
+
+# The status a page moves through: waiting to be fetched, started, finished.
+# A page that kept failing is given up on, so one dead URL can't hold up every later run.
+PENDING = 'pending'
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+FAILED = 'failed'
+
+# The statuses that need no more work.
+FINISHED = (DONE, FAILED)
+
+# How many runs may try a page before it is marked FAILED.
+MAX_ATTEMPTS = 3
+
+
+class CrawlState:
+    """
+    Durable crawl progress, saved in a SQLite file after every step.
+    Each page (the homepage, category listings, products and colour variants) is keyed by its URL and
+    page type, because one product's colour page is often another product's own page. It has a status of
+    'pending', 'in_progress', 'done' or 'failed', the number of failed attempts, the page it was found on, and a small JSON payload:
+    the listing data of a queued product, or the scraped details of a colour page.
+    If a run dies, the next run reads this back and carries on without fetching finished pages again.
+    Pass path=None to keep the state in memory for a single run only.
+    """
+
+    def __init__(self, path='crawl_state.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        # check_same_thread=False lets worker threads share the connection; the lock serialises access.
+        self._connection = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS crawl_pages (url TEXT, page_type TEXT, parent TEXT, "
+            "status TEXT, payload TEXT, updated_at REAL, attempts INTEGER DEFAULT 0, PRIMARY KEY (url, page_type))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS crawl_pages_by_parent ON crawl_pages (parent, page_type)")
+        self._connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM crawl_pages").fetchone()[0]
+
+    def status(self, url, page_type):
+        """
+        Returns the status of a page of the given type, or None if the crawl hasn't seen it yet.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT status FROM crawl_pages WHERE url = ? AND page_type = ?",
+                                           (url, page_type)).fetchone()
+        return row[0] if row else None
+
+    def payload(self, url, page_type):
+        """
+        Returns the saved payload of a page of the given type, or None.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT payload FROM crawl_pages WHERE url = ? AND page_type = ?",
+                                           (url, page_type)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def add_pages(self, parent, page_type, pages):
+        """
+        Saves pages found on parent as pending, in the order given. pages is a list of (url, payload) pairs.
+        Pages the state already knows keep their current status.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO crawl_pages (url, page_type, parent, status, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(url, page_type, parent, PENDING, None if payload is None else json.dumps(payload), now)
+                 for url, payload in pages]
+            )
+            self._connection.commit()
+
+    def children(self, parent, page_type):
+        """
+        Returns (url, status, payload) for every page of page_type found on parent, in the order they were found.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT url, status, payload FROM crawl_pages WHERE parent = ? AND page_type = ? ORDER BY rowid",
+                (parent, page_type)
+            ).fetchall()
+        return [(url, status, json.loads(payload) if payload is not None else None) for url, status, payload in rows]
+
+    def mark(self, url, status, page_type, payload=None):
+        """
+        Sets the status of a page of the given type (adding it if needed) and, if given, replaces its payload.
+        """
+        with self._lock:
+            updated = self._connection.execute(
+                "UPDATE crawl_pages SET status = ?, payload = COALESCE(?, payload), updated_at = ? WHERE url = ? AND page_type = ?",
+                (status, None if payload is None else json.dumps(payload), time.time(), url, page_type)
+            )
+            if updated.rowcount == 0:
+                self._connection.execute(
+                    "INSERT INTO crawl_pages (url, page_type, parent, status, payload, updated_at) VALUES (?, ?, NULL, ?, ?, ?)",
+                    (url, page_type, status, None if payload is None else json.dumps(payload), time.time())
+                )
+            self._connection.commit()
+
+    def fail(self, url, page_type, max_attempts=MAX_ATTEMPTS):
+        """
+        Records a failed attempt at a page. It goes back to pending to be tried again, or is marked
+        failed once it has failed max_attempts times. Returns the new status.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO crawl_pages (url, page_type, parent, status, payload, updated_at) VALUES (?, ?, NULL, ?, NULL, ?)",
+                (url, page_type, PENDING, time.time())
+            )
+            self._connection.execute(
+                "UPDATE crawl_pages SET attempts = attempts + 1, "
+                "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END, updated_at = ? WHERE url = ? AND page_type = ?",
+                (max_attempts, FAILED, PENDING, time.time(), url, page_type)
+            )
+            self._connection.commit()
+            return self._connection.execute("SELECT status FROM crawl_pages WHERE url = ? AND page_type = ?",
+                                            (url, page_type)).fetchone()[0]
+
+    def forget(self, urls, page_type):
+        """
+        Removes pages of the given type from the checkpoint, as if the crawl had never found them.
+        """
+        with self._lock:
+            self._connection.executemany("DELETE FROM crawl_pages WHERE url = ? AND page_type = ?",
+                                         [(url, page_type) for url in urls])
+            self._connection.commit()
+
+    def unfinished(self):
+        """
+        Counts the pages that still need work (not done and not given up on), by page type.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT page_type, COUNT(*) FROM crawl_pages WHERE status NOT IN (?, ?) GROUP BY page_type", FINISHED
+            ).fetchall()
+        return dict(rows)
+
+    def clear(self):
+        """
+        Forgets all progress so the next crawl starts from the homepage.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM crawl_pages")
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
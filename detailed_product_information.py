@@ -1,7 +1,15 @@
 # Import necessary libraries.
-from bs4 import BeautifulSoup # Used for parsing HTML.
-# Assumes 'scrape_url_script.py' exists and contains the scrape_specific_url function.
-from scrape_url_script import scrape_specific_url
+import logging # Used for levelled progress and error messages.
+import asyncio # Product and color pages are fetched as coroutines through the crawl scheduler.
+from urllib.parse import urljoin # Used to turn relative color links into full URLs.
+from html_parser import make_soup # Parses only the parts of a page we need, with lxml when available.
+from artifacts import dump_artifact # Saves optional per-URL debug copies of pages.
+from metrics import METRICS # Records stage timings and counts for the run summary.
+from crawl_state import DONE, IN_PROGRESS # Page statuses in the crawl checkpoint.
+from structured_data import read_structured_product, DETAIL_FIELDS # Fast path: the page's embedded JSON-LD.
+from records import ProductDetails, VariantOption, parse_price, text_or_none # The typed product model.
+
+logger = logging.getLogger(__name__)
 
 
 def get_size_price_availability(color_soup, color):
@@ -9,15 +17,13 @@ def get_size_price_availability(color_soup, color):
     Extracts size, price, and availability for a specific product color variant.
     """
 
-    # Pre-defined list of sizes. Note: This might need adjustment if sizes vary.
-    sizes = ['S', 'M', 'L', 'XL', 'XXL', 'XXXL']
     size = []
     # Find all buttons that represent product sizes.
     size_tag = color_soup.find_all('button', class_='nwc-btn nw-size-chip')
 
-    # Populate the size list based on the number of size tags found.
-    for i in range(len(size_tag)):
-        size.append(sizes[i])
+    # Read the size label printed on each chip.
+    for tag in size_tag:
+        size.append(tag.get_text(strip=True))
 
     # Find all tags containing the price.
     price_tags = color_soup.find_all('span', class_='nwc-hide', attrs={"itemprop": "price"})
@@ -28,108 +34,150 @@ def get_size_price_availability(color_soup, color):
     for tag in availability_tag:
         availability.append(tag.get_text(strip=True))
     price = []
-    # Extract the text from each price tag.
+    # Read each price tag as a number (None if it can't be read).
     for tag in price_tags:
-        price.append(tag.get_text(strip=True))
+        price.append(parse_price(tag.get_text(strip=True)))
     
-    # Structure the collected data into a dictionary.
-    variant = {
-        'color': color,
-        'size': size,
-        'price': price,
-        'availability': availability
-    }
+    # Structure the collected data into a variant.
+    variant = VariantOption(color=color, size=size, price=price, availability=availability)
 
-    print(f"Extracted variant: {variant}")
+    logger.debug(f"Extracted variant: {variant}")
 
     return variant
 
-def get_variant_options(url_soup):
-    """
-    Finds all color options on a product page and scrapes each one for details.
-    """
-    variant_options = []
-    # Find all links corresponding to different color options.
-    color_tags = url_soup.find_all('a', class_='nw-color-item nwc-anchortag')
-    # Get the URL of the currently selected color.
-    color_url = url_soup.find('a', class_='nw-color-item selected nwc-anchortag').get('href','')
-    # Construct the full URL for the color page.
-    complete_color_url = color_url if color_url.startswith('https') else f"https://www.nnnow.com{color_url}"
-    # Scrape the color page and save its HTML.
-    scrape_specific_url(complete_color_url, "temp.html")
-    # Read the saved HTML file.
-    with open("temp.html", 'r', encoding='utf-8') as f:
-            color_html_content = f.read()
-    # Parse the color page's HTML.
-    color_soup = BeautifulSoup(color_html_content, 'html.parser')
+def read_variant(color_soup):
+    """
+    Reads the color name, sizes, prices and availability from a parsed color (or product) page.
+    """
     # Extract the name of the color.
-    color_name = color_soup.find('span', class_='nw-color-name').get_text(strip=True) if color_soup.find('span', class_='nw-color-name') else 'Not found'
+    color_tag = color_soup.find('span', class_='nw-color-name')
+    color_name = text_or_none(color_tag.get_text(strip=True)) if color_tag else None
     # Get the size, price, and availability for this color.
-    variant_info = get_size_price_availability(color_soup, color=color_name)
-    variant_options.append(variant_info)
-
-    print(color_tags)
-
-    # Loop through the other available color options.
-    for i in range(int(len(color_tags)/2)):
-        color_url = color_tags[i].get('href','')
-        complete_color_url = color_url if color_url.startswith('https') else f"https://www.nnnow.com{color_url}"
-        # Scrape each color's page to get its specific details.
-        scrape_specific_url(complete_color_url, "temp.html")
-        with open("temp.html", 'r', encoding='utf-8') as f:
-            color_html_content = f.read()
-        color_soup = BeautifulSoup(color_html_content, 'html.parser')
-        color_name = color_soup.find('span', class_='nw-color-name').get_text(strip=True) if color_soup.find('span', class_='nw-color-name') else 'Not found'
-        variant_info = get_size_price_availability(color_soup, color=color_name)
-        variant_options.append(variant_info)
-
-    return variant_options
-
-def extract_detailed_product_info(complete_url):
-    """
-    Orchestrates the scraping of a single product page for all detailed information.
-    """
-    try:
-        # Scrape the main product URL and save its HTML to a temporary file.
-        scrape_specific_url(complete_url, "temp.html")
-        # Read the content of the temporary HTML file.
-        with open("temp.html", 'r', encoding='utf-8') as f:
-            url_html_content = f.read()
-        # Parse the page's HTML content.
-        url_soup = BeautifulSoup(url_html_content, 'html.parser')
-        # Save a prettified version for debugging purposes.
-        with open("temp2.html","w",encoding='utf-8') as f:
-            f.write(url_soup.prettify())
-    except Exception as e:
-        # Handle errors during the scraping process gracefully.
-        print(f"Error fetching or reading the product page: {e}")
-        # Return a dictionary with default "not found" values.
-        return {
-            'material' : "Material not found",
-            'description': "Description not found",
-            'additional_image_link': [],
-            'variant_options':[{
-                                'color':"Not found",
-                                'size':"Not found",
-                                "price" : "Not found",
-                                "sale_price" : "Not found"
-                            }]
-        }
+    return get_size_price_availability(color_soup, color=color_name)
+
+def read_variant_page(complete_color_url, color_html_content):
+    """
+    Reads one color page: from its JSON-LD when it has usable offers, otherwise from the DOM.
+    """
+    structured = read_structured_product(color_html_content, complete_color_url)
+    if structured and structured['variants']:
+        METRICS.increment('structured_data_pages')
+        return structured['variants'][0]
+    # Parse just the color name, size chips and price spans of the color page.
+    return read_variant(make_soup(color_html_content, 'variant'))
+
+def read_variant_pages(color_urls, color_html_pages):
+    """
+    Reads a batch of color pages, returning one variant per page.
+    """
+    return [read_variant_page(complete_color_url, color_html_content)
+            for complete_color_url, color_html_content in zip(color_urls, color_html_pages)]
+
+def cached_variant(complete_color_url, freshness=None, refresh=False, state=None):
+    """
+    Returns the details of a color page we already have, or None if it needs fetching.
+    With a crawl state, a color page finished before an interruption is reused.
+    With a freshness store, a recently scraped color page is reused unless refresh is True.
+    """
+    if state is not None and state.status(complete_color_url, 'variant') == DONE:
+        return VariantOption.from_dict(state.payload(complete_color_url, 'variant'))
+    if freshness is not None and not refresh:
+        variant = freshness.get_variant(complete_color_url)
+        if variant is not None:
+            logger.debug(f"Using cached variant for {complete_color_url}")
+            METRICS.increment('variant_cache_hits')
+            return VariantOption.from_dict(variant)
+    return None
+
+def find_color_urls(url_soup, page_url):
+    """
+    Returns the URLs of the other colors linked from a product page, without duplicates
+    and without the selected color (whose details are already on the product page).
+    """
+    # Find all links corresponding to different color options, including the selected one.
+    color_tags = url_soup.find_all('a', class_='nw-color-item')
+    logger.debug("Color links: %s", color_tags)
+
+    color_urls = []
+    for tag in color_tags:
+        color_url = tag.get('href', '')
+        # Skip the selected color and links without a target.
+        if not color_url or 'selected' in tag.get('class', []):
+            continue
+        # Construct the full URL for the color page.
+        color_urls.append(urljoin(page_url, color_url))
+    # The color list is rendered more than once on the page; keep each URL once, in page order.
+    return [color_url for color_url in dict.fromkeys(color_urls) if color_url != page_url]
+
+async def get_variant_options(color_urls, scheduler, freshness=None, refresh_variants=False, state=None):
+    """
+    Scrapes the given color pages for their size, price, and availability, in the order given.
+    Color pages we already have are reused, and the rest are queued in the crawl frontier as one
+    batch, so they load side by side (in tabs of one browser when the browser is used).
+    """
+    variants = {}
+    to_fetch = []
+    for complete_color_url in color_urls:
+        variant = cached_variant(complete_color_url, freshness=freshness, refresh=refresh_variants, state=state)
+        if variant is not None:
+            variants[complete_color_url] = variant
+        else:
+            to_fetch.append(complete_color_url)
+
+    if to_fetch:
+        color_html_pages = await scheduler.fetch_many(to_fetch, 'variant')
+        METRICS.increment('variant_pages', len(to_fetch))
+        # Parse on a worker thread so the scheduler keeps dispatching fetches meanwhile.
+        fetched_variants = await asyncio.to_thread(read_variant_pages, to_fetch, color_html_pages)
+        for complete_color_url, color_html_content, variant in zip(to_fetch, color_html_pages, fetched_variants):
+            variants[complete_color_url] = variant
+            # Only cache pages that actually loaded.
+            if freshness is not None and color_html_content:
+                freshness.put_variant(complete_color_url, variant.to_dict())
+            if state is not None and color_html_content:
+                state.mark(complete_color_url, DONE, 'variant', payload=variant.to_dict())
+
+    return [variants[complete_color_url] for complete_color_url in color_urls]
+
+def read_product_page(complete_url, url_html_content):
+    """
+    Parses a product page and returns its ProductDetails (material, description, category, gender,
+    images and the variants read from the page itself, the color it shows first) and the URLs of the
+    color pages that still need loading.
+    The page's JSON-LD is read first. If it describes the product and every color, the DOM is never
+    parsed; otherwise the DOM fills in whatever the JSON-LD is missing.
+    """
+    structured = read_structured_product(url_html_content, complete_url) or {}
+    if structured.get('all_colors') and all(field in structured for field in DETAIL_FIELDS):
+        METRICS.increment('structured_data_pages')
+        return ProductDetails(variant_options=structured['variants'], **{field: structured[field] for field in DETAIL_FIELDS}), []
+
+    # Parse only the product-page regions we extract from.
+    url_soup = make_soup(url_html_content, 'product')
+    # Save a prettified version for debugging, only if artifact dumping is enabled.
+    dump_artifact(complete_url, 'pretty', soup=url_soup)
 
     # Find all tags related to the product description.
     description_tags = url_soup.find_all('div', class_='nw-pdp-desktopaccordiondetailssection')
-    description = ""
+    # Some products have fewer sections; leave those values empty (None) instead of failing.
+    material = None
+    description = None
     # Extract material from the first description section.
-    material = description_tags[0].find_all('li', class_='nw-pdp-desktopaccordiondetailsli')[0].get_text(strip=True)
+    material_items = description_tags[0].find_all('li', class_='nw-pdp-desktopaccordiondetailsli') if description_tags else []
+    if material_items:
+        material = material_items[0].get_text(strip=True)
     # Extract title and list items from the second description section.
-    desc1 = description_tags[1].find('h3', class_='nw-pdp-desktopaccordiondetailstitle').get_text(strip=True)
-    desc2 = description_tags[1].find_all('li', class_='nw-pdp-desktopaccordiondetailsli')
-    # Combine the parts into a single description string.
-    if desc1:
-        description += desc1
-    if desc2:
-        description += " ".join([li.get_text(strip=True) for li in desc2])
-    description += "\n"
+    if len(description_tags) > 1:
+        title_tag = description_tags[1].find('h3', class_='nw-pdp-desktopaccordiondetailstitle')
+        desc1 = title_tag.get_text(strip=True) if title_tag else ""
+        desc2 = description_tags[1].find_all('li', class_='nw-pdp-desktopaccordiondetailsli')
+        # Combine the parts into a single description string.
+        description = ""
+        if desc1:
+            description += desc1
+        if desc2:
+            description += " ".join([li.get_text(strip=True) for li in desc2])
+        description += "\n"
 
     # Extract the product category from the breadcrumb navigation.
     breadcrumb_tags = url_soup.find_all('span', class_='nw-breadcrumb-listitem')
@@ -151,17 +199,48 @@ def extract_detailed_product_info(complete_url):
         if img and img.has_attr('src'):
             additional_images.append(img['src'])
 
-    print(f"Extracted additional images: {additional_images}")
-
-    # Get all variant options (colors, sizes, etc.).
-    variant_options = get_variant_options(url_soup)
+    logger.debug(f"Extracted additional images: {additional_images}")
 
-    # Return the final dictionary of all extracted details.
-    return {
+    details = {
         'material' : material,
         'description': description,
         'additional_image_link': additional_images,
-        'variant_options': variant_options,
-        'product_category': product_category,
-        'gender': gender
+        'product_category': product_category or None,
+        'gender': text_or_none(gender)
     }
+    # Whatever the JSON-LD did have is cheaper and more exact than the DOM.
+    details.update({field: structured[field] for field in DETAIL_FIELDS if field in structured})
+    # The product page already shows the selected color's sizes and prices, so read them here
+    # instead of loading the same page again.
+    page_variants = structured['variants'] if structured.get('variants') else [read_variant(url_soup)]
+    color_urls = [] if structured.get('all_colors') else find_color_urls(url_soup, complete_url)
+    return ProductDetails(variant_options=page_variants, **details), color_urls
+
+async def extract_detailed_product_info(complete_url, scheduler, freshness=None, refresh_variants=False, state=None):
+    """
+    Orchestrates the scraping of a single product page for all detailed information, returned as ProductDetails,
+    or None if the product page could not be loaded.
+    The product page and then its color pages are fetched through the crawl scheduler.
+    In incremental mode (a freshness store is passed in) recently scraped color pages are reused,
+    unless refresh_variants is True because the product's listing data changed.
+    With a crawl state, the product is checkpointed as in progress and each finished color page is saved.
+    """
+    if state is not None:
+        state.mark(complete_url, IN_PROGRESS, 'product')
+    # Queue the product page in the crawl frontier and wait for its HTML.
+    url_html_content = await scheduler.fetch(complete_url, 'product')
+    if url_html_content is None:
+        # Handle pages that failed even after retries gracefully.
+        logger.warning(f"Error fetching the product page {complete_url}.")
+        # Return None so the caller doesn't write (or checkpoint) a product with nothing but listing data.
+        return None
+
+    # Parse on a worker thread so the scheduler keeps dispatching fetches meanwhile.
+    details, color_urls = await asyncio.to_thread(read_product_page, complete_url, url_html_content)
+
+    # Add the variant options (colors, sizes, etc.) of the other color pages.
+    with METRICS.timer('variant_fanout', url=complete_url):
+        details.variant_options.extend(await get_variant_options(color_urls, scheduler, freshness=freshness, refresh_variants=refresh_variants, state=state))
+
+    # Return the ProductDetails with everything we extracted.
+    return details
@@ -0,0 +1,168 @@
+# Runs the crawl across several processes or machines that share one work queue.
+#
+# Usage (from the project folder):
+#   python distributed.py coordinator --queue work_queue.db                 # queue every category page
+#   python distributed.py worker --queue work_queue.db --output data.db     # start as many of these as you like
+#   python distributed.py export --output data.db --jsonl data.jsonl        # write the results out as JSONL
+#
+# --queue is the path of a SQLite file (for workers on one machine or a shared disk) or a redis:// URL
+# (for workers on several machines; needs the 'redis' package).
+import logging  # Used for levelled progress and error messages.
+import argparse  # Used to read the command-line options.
+import asyncio  # Each worker runs its jobs as coroutines.
+import os  # Used to build a default worker name.
+import socket  # Used to build a default worker name.
+from crawl_scheduler import CrawlScheduler
+from extract_product_information import list_products, scrape_products
+from fetcher import SiteFetcher, PAGE_BACKENDS
+from html_parser import make_soup
+from metrics import METRICS
+from output_sink import open_sink, export_sqlite_jsonl
+from scrape_url_script import configure_driver_pool, close_driver_pool
+from seen_index import SeenIndex
+from site_profile import load_site_profile, DEFAULT_SITE_PROFILE
+from work_queue import open_work_queue
+
+logger = logging.getLogger(__name__)
+
+# How long an idle worker waits before checking the queue again, in seconds.
+POLL_INTERVAL = 5
+
+
+def run_coordinator(queue_location='work_queue.db', site_profile=DEFAULT_SITE_PROFILE, page_backends=PAGE_BACKENDS, fetcher=None):
+    """
+    Fetches the homepage and queues every category listing page. Workers turn each listing into
+    product jobs as they go. Returns the number of categories queued.
+    """
+    plan = load_site_profile(site_profile)
+    owns_fetcher = fetcher is None
+    if owns_fetcher:
+        fetcher = SiteFetcher(backends=page_backends, plan=plan)
+    queue = open_work_queue(queue_location)
+    try:
+        html_content = fetcher.fetch(plan.base_url, 'home')
+        if html_content is None:
+            logger.error("Could not load the homepage. Nothing to queue.")
+            return 0
+        soup = make_soup(html_content, 'home', regions=plan.navigation_regions())
+        category_urls = []
+        for link in plan.find_navigation_links(soup):
+            page_url = link.get('href', '')
+            category_urls.append(page_url if page_url.startswith('https') else f"https://{page_url}")
+        queue.put_many('listing', [(url, None) for url in category_urls])
+        logger.info(f"Queued {len(category_urls)} category pages in '{queue_location}'.")
+        return len(category_urls)
+    finally:
+        queue.close()
+        if owns_fetcher:
+            fetcher.close()
+        close_driver_pool()
+
+
+async def _run_job(url, page_type, payload, queue, scheduler, plan, sink, seen_index):
+    """
+    Runs one job: a listing job queues its products, a product job scrapes and writes one product.
+    A product whose page could not be scraped is given back to the queue to be retried.
+    """
+    try:
+        if page_type == 'listing':
+            html_content = await scheduler.fetch(url, 'listing')
+            if html_content is None:
+                raise ValueError(f"no HTML came back for {url}")
+            queued_products = await asyncio.to_thread(list_products, html_content, url, plan=plan)
+            # Products already queued from another category are ignored by the queue.
+            await asyncio.to_thread(queue.put_many, 'product', [(queued['complete_url'], queued) for queued in queued_products])
+            logger.info(f"Queued {len(queued_products)} products from {url}.")
+        else:
+            # scrape_products flushes the sink before returning, so the record is stored before the job is marked done.
+            products = await scrape_products([payload], scheduler, sink=sink, seen_index=seen_index)
+            if not products:
+                raise ValueError(f"the product page {url} could not be scraped")
+        await asyncio.to_thread(queue.complete, url)
+    except Exception as e:
+        logger.error(f"Job {url} failed: {e}")
+        METRICS.increment('job_failures', url=url)
+        await asyncio.to_thread(queue.fail, url)
+
+
+async def _work(queue, worker_id, scheduler, plan, sink, seen_index, max_jobs):
+    """
+    Keeps up to max_jobs jobs running until the whole queue is finished.
+    """
+    running = set()
+    async with scheduler:
+        while True:
+            if len(running) < max_jobs:
+                jobs = await asyncio.to_thread(queue.claim, worker_id, max_jobs - len(running))
+                for url, page_type, payload in jobs:
+                    running.add(asyncio.create_task(_run_job(url, page_type, payload, queue, scheduler, plan, sink, seen_index)))
+            if not running:
+                # Nothing to do here. Other workers may still add products from the listings they hold.
+                if await asyncio.to_thread(queue.unfinished) == 0:
+                    break
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            _, running = await asyncio.wait(running, timeout=POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+
+
+def run_worker(queue_location='work_queue.db', output_path='data.db', worker_id=None, max_workers=2, pool_size=2,
+               max_pages_per_driver=50, requests_per_second=1.0, burst=2, max_retries=3,
+               site_profile=DEFAULT_SITE_PROFILE, page_backends=PAGE_BACKENDS, fetcher=None, metrics_path=None):
+    """
+    Pulls jobs from the shared queue and runs them until the queue is empty.
+    Records go to output_path; use a .db file so every worker can share it and each product id is stored once.
+    max_workers and requests_per_second apply to this worker only, so the whole fleet sends up to
+    (number of workers x requests_per_second) requests per second to each host.
+    """
+    METRICS.reset()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    plan = load_site_profile(site_profile)
+    configure_driver_pool(size=max(pool_size, max_workers), max_pages_per_driver=max_pages_per_driver)
+    queue = open_work_queue(queue_location)
+    sink = open_sink(output_path)
+    # One in-memory index for all of this worker's jobs; the queue already hands out each product once.
+    seen_index = SeenIndex(path=None)
+    owns_fetcher = fetcher is None
+    if owns_fetcher:
+        fetcher = SiteFetcher(backends=page_backends, plan=plan)
+    scheduler = CrawlScheduler(fetcher, max_concurrency=max_workers, requests_per_second=requests_per_second,
+                               burst=burst, max_retries=max_retries)
+    logger.info(f"Worker {worker_id} is starting on '{queue_location}'.")
+    try:
+        asyncio.run(_work(queue, worker_id, scheduler, plan, sink, seen_index, max_jobs=max_workers))
+        logger.info(f"Worker {worker_id} finished: the queue is empty.")
+    finally:
+        close_driver_pool()
+        if owns_fetcher:
+            fetcher.close()
+        sink.close()
+        seen_index.close()
+        queue.close()
+        if metrics_path:
+            METRICS.export_json(metrics_path)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Crawl with several workers sharing one work queue.")
+    arg_parser.add_argument('role', choices=['coordinator', 'worker', 'export'])
+    arg_parser.add_argument('--queue', default='work_queue.db', help="SQLite file or redis:// URL of the shared queue.")
+    arg_parser.add_argument('--output', default='data.db', help="Where workers write records (a .db file is shared safely).")
+    arg_parser.add_argument('--jsonl', default='data.jsonl', help="JSONL file written by 'export'.")
+    arg_parser.add_argument('--workers', type=int, default=2, help="Pages this worker fetches at the same time.")
+    arg_parser.add_argument('--rate', type=float, default=1.0, help="Requests per second per host, for this worker.")
+    arg_parser.add_argument('--name', default=None, help="Worker name shown in the queue (hostname-pid by default).")
+    args = arg_parser.parse_args()
+
+    if args.role == 'coordinator':
+        run_coordinator(args.queue)
+    elif args.role == 'worker':
+        run_worker(args.queue, output_path=args.output, worker_id=args.name, max_workers=args.workers,
+                   requests_per_second=args.rate)
+    else:
+        export_sqlite_jsonl(args.output, args.jsonl)
+
+
+if __name__ == "__main__":
+    # Show progress messages; use logging.DEBUG for more detail.
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    main()
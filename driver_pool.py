@@ -0,0 +1,162 @@
+# Import necessary libraries for managing a pool of browser sessions.
+import logging  # Used for levelled progress and error messages.
+import threading  # Used to guard the pool's bookkeeping and wake callers waiting for a browser.
+import time  # Used for the borrow timeout.
+from contextlib import contextmanager  # Lets callers borrow a browser with a 'with' block.
+
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """
+    A small wrapper that remembers how many pages a browser has loaded,
+    so the pool knows when it is time to recycle it.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_served = 0
+        self.broken = False
+
+
+class DriverPool:
+    """
+    Keeps a handful of WebDriver sessions alive and lends them out,
+    so a crawl starts a few browsers instead of one per URL.
+    """
+
+    def __init__(self, driver_factory, size=2, max_pages_per_driver=50):
+        # The function that builds a brand new browser when the pool needs one.
+        self.driver_factory = driver_factory
+        # The maximum number of browsers that can be alive at the same time.
+        self.size = size
+        # Recycle a browser after it has served this many pages to limit memory leaks.
+        self.max_pages_per_driver = max_pages_per_driver
+
+        # Idle browsers waiting to be borrowed; the most recently returned one is lent out first.
+        self._idle = []
+        # Number of browsers currently alive (idle + borrowed).
+        self._alive = 0
+        # Guards the two fields above. Waiting callers are woken whenever a browser is returned
+        # or a slot is freed, so a recycled browser lets the next caller start a new one.
+        self._available = threading.Condition()
+        self._closed = False
+
+    def _is_healthy(self, pooled):
+        """
+        Checks that a browser is still responding before handing it out.
+        """
+        if pooled.broken:
+            return False
+        try:
+            # A trivial script round-trip tells us the session and the browser are alive.
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Browser session failed its health check: {e}")
+            return False
+
+    def _destroy(self, pooled):
+        """
+        Quits a browser and frees its slot in the pool.
+        """
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Could not close the browser cleanly: {e}")
+        with self._available:
+            self._alive -= 1
+            self._available.notify()
+
+    def _take(self, deadline):
+        """
+        Waits until an idle browser or a free slot is available. Returns the idle browser, or None
+        after reserving a slot for a new one.
+        """
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The driver pool has been closed.")
+                # Prefer reusing an idle browser.
+                if self._idle:
+                    return self._idle.pop()
+                # No idle browser, so start a new one if we are below the size limit.
+                if self._alive < self.size:
+                    self._alive += 1
+                    return None
+                # The pool is full, so wait for another caller to return or recycle a browser.
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a free browser in the pool.")
+                self._available.wait(remaining)
+
+    def acquire(self, timeout=None):
+        """
+        Borrows a healthy browser from the pool, starting a new one if there is room.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pooled = self._take(deadline)
+            if pooled is not None:
+                if self._is_healthy(pooled):
+                    return pooled
+                # The browser crashed while idle, throw it away and try again.
+                self._destroy(pooled)
+                continue
+            try:
+                return PooledDriver(self.driver_factory())
+            except Exception:
+                # Give the slot back if the browser failed to launch.
+                with self._available:
+                    self._alive -= 1
+                    self._available.notify()
+                raise
+
+    def release(self, pooled, pages=1):
+        """
+        Returns a borrowed browser to the pool, recycling it if it is worn out or broken.
+        pages is how many pages it loaded while borrowed (more than one when pages were loaded in tabs).
+        """
+        pooled.pages_served += pages
+        worn_out = pooled.pages_served >= self.max_pages_per_driver
+        if not pooled.broken and not worn_out:
+            with self._available:
+                # A browser returned after close() is shut down below instead.
+                if not self._closed:
+                    self._idle.append(pooled)
+                    self._available.notify()
+                    return
+        elif not pooled.broken:
+            logger.info(f"Recycling browser after {pooled.pages_served} pages.")
+        # Quitting it frees its slot and wakes a waiting caller, who starts a fresh browser.
+        self._destroy(pooled)
+
+    @contextmanager
+    def borrow(self, timeout=None, pages=1):
+        """
+        Lends out a browser for the duration of a 'with' block that loads the given number of pages.
+        If an exception is raised inside the block, the browser is health checked and replaced if it
+        no longer responds; a browser that still works goes back to the pool.
+        """
+        pooled = self.acquire(timeout=timeout)
+        try:
+            yield pooled.driver
+        except Exception:
+            # A browser that blew up mid-page is replaced if it no longer responds.
+            pooled.broken = not self._is_healthy(pooled)
+            raise
+        finally:
+            self.release(pooled, pages=pages)
+
+    def close(self):
+        """
+        Shuts down every idle browser. Borrowed browsers are closed when they are returned.
+        """
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            # Wake every waiting caller so it sees the pool is closed.
+            self._available.notify_all()
+        for pooled in idle:
+            self._destroy(pooled)
+        logger.info("All pooled browser sessions have been closed.")
@@ -1,143 +1,272 @@
 # Import necessary libraries for data parsing and file handling.
-from time import time
-from bs4 import BeautifulSoup # Used for parsing HTML and extracting data.
+import logging # Used for levelled progress and error messages.
+import asyncio # Product pages are scraped as coroutines through the crawl scheduler.
+from html_parser import make_soup # Parses only the parts of a page we need, with lxml when available.
 from hashlib import sha256 # Used for creating a unique hash ID for products.
-import json # Used for saving the extracted data to a JSON file.
-import os # Used for interacting with the operating system, like writing new lines.
-import random
+from output_sink import JsonlSink # Streams records to disk one line at a time.
+from seen_index import SeenIndex # Remembers which products were already scraped.
+from freshness import listing_fingerprint # Fingerprints listing data for incremental crawls.
+from site_profile import load_site_profile # Loads the compiled selector configuration.
+from artifacts import dump_artifact # Saves optional per-URL debug copies of pages.
+from metrics import METRICS # Records stage timings and counts for the run summary.
+from contextlib import aclosing # Closes the listing stream (and frees its browser) when we stop early.
+from collections import deque # Holds the product batches still being scraped in streaming mode.
+from crawl_state import DONE, FINISHED # Statuses of finished pages in the crawl checkpoint.
+from records import ProductRecord, parse_price # The typed product model.
 
 # This script assumes a separate file named 'detailed_product_information.py' exists,
 # containing the 'extract_detailed_product_info' function.
 from detailed_product_information import extract_detailed_product_info
 
-def append_record(record, filename='data.json'):
-    """
-    Appends a dictionary to a list in a JSON file.
-    """
-    try:
-        # Try to open and read the file
-        with open(filename, 'r') as f:
-            # Load the existing data into a list
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # If the file doesn't exist or is empty, start with an empty list
-        data = []
-
-    # Ensure the data is a list
-    if not isinstance(data, list):
-        print("Error: JSON file does not contain a list.")
-        return
+logger = logging.getLogger(__name__)
 
-    # Append the new dictionary
-    data.append(record)
+# Only the first few products of each category are scraped, to keep test runs short.
+MAX_PRODUCTS_PER_CATEGORY = 5
 
-    # Write the updated list back to the file
-    with open(filename, 'w') as f:
-        # Use indent for pretty-printing
-        json.dump(data, f, indent=4)
+def append_record(record, sink):
+    """
+    Streams one ProductRecord to the output sink (one JSON line by default).
+    """
+    with METRICS.timer('sink_write'):
+        sink.write(record)
+    METRICS.increment('records_written')
 
 
-def extract_product_data(html_filepath,pretty_filepath, class_list, url_tag, url_class,attr_url_dictionary,attributes_dictionary,product_brand_tag,product_brand_class,product_price_tag,product_price_class,product_sale_price_tag,product_sale_price_class,title_tag,title_class,product_image_tag,product_image_class,product_image_dict):
+def list_products(html_content, page_url, plan=None, seen_index=None, freshness=None, queued_ids=None):
     """
-    Extracts product information from a given html file with product listings in the form a list of dictionaries
+    Reads the product cards of a listing page and returns the listing data of every product that
+    needs a detail scrape, in listing order.
+    Products whose id is in seen_index (or that appear twice on the page) are skipped, and so are
+    fresh products in incremental mode.
+    When a page is read in several parts, pass the same queued_ids set to every call so a product
+    that shows up in two parts is only queued once.
     """
-    # This list will store the dictionaries of product data.
-    products_data = []
+    # This list will store the listing data of every product queued for a detail scrape.
+    queued_products = []
 
-    try:
-        # Read the content from the saved HTML file.
-        with open(html_filepath, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-    except FileNotFoundError:
-        # Handle the case where the HTML file doesn't exist.
-        print(f"Error: '{html_filepath}' not found. Cannot Extract data.")
-        return products_data # Return an empty list.
-
-    # Parse the HTML content with BeautifulSoup for easy data extraction.
-    soup = BeautifulSoup(html_content, 'html.parser')
-    if soup:
-        with open(pretty_filepath, 'w', encoding='utf-8') as f:
-            f.write(soup.prettify())
+    if not html_content:
+        # Handle the case where the listing page could not be scraped.
+        logger.error(f"Error: no HTML for '{page_url}'. Cannot Extract data.")
+        return queued_products # Return an empty list.
+
+    # Use the default site profile if no plan was given.
+    plan = plan or load_site_profile()
+
+    # Parse only the product cards, skipping the rest of the page.
+    soup = make_soup(html_content, 'listing', regions=plan.listing_regions())
+    # Save a prettified copy for debugging, only if artifact dumping is enabled.
+    dump_artifact(page_url, 'pretty', soup=soup)
 
     # Find all parent elements that contain individual product listings.
-    product_listings = soup.find_all(class_=class_list, attrs = attributes_dictionary)
+    product_listings = plan.find_listings(soup)
 
     if not product_listings:
         # Inform the user if no products were found with the given criteria.
-        print("No product listings found with the specified selectors. Check the tags and class names.")
-        return products_data # Return an empty list.
+        logger.warning("No product listings found with the specified selectors. Check the tags and class names.")
+        return queued_products # Return an empty list.
 
-    print(f"Found {len(product_listings)} products. Extracting data...")
+    logger.info(f"Found {len(product_listings)} products. Extracting data...")
+    # Ids queued from this page, so a product listed twice is only scraped once.
+    if queued_ids is None:
+        queued_ids = set()
     count = 0
     # Iterate through each product listing found.
     for product_tag in product_listings:
-        if count >= 5:
-            break  # Limit to 5 products for testing purposes.
-
-        #there are too many requests in a short time, so we add a delay
-        if count%10 == 0 and count != 0:
-            random_delay = random.uniform(5,12)  # Random delay between 5 to 12 seconds for more realistic behavior
-            print(f"Pausing for {random_delay:.2f} seconds to avoid overwhelming the server.")
-            time.sleep(random_delay)
-
-        # Find individual data points (title, price, etc.) within each product tag.
-        title_tag_element = product_tag.find(title_tag, class_=title_class)
-        url_tag_element = product_tag.find(url_tag, class_=url_class, attrs = attr_url_dictionary)
-        brand_tag_element = product_tag.find(product_brand_tag,class_=product_brand_class)
-        price_tag_element = product_tag.find(product_price_tag,class_=product_price_class)
-        sale_price_tag_element = product_tag.find(product_sale_price_tag,class_=product_sale_price_class)
-        image_tag_element = product_tag.find(product_image_tag,class_=product_image_class,attrs=product_image_dict)
-
-        # Safely extract text, providing a default value if an element is not found.
-        title = title_tag_element.get_text(strip=True) if title_tag_element else "Name not found"
-        url = url_tag_element.get_text(strip=True) if url_tag_element else "URL not found"
+        if count >= MAX_PRODUCTS_PER_CATEGORY:
+            break  # Limit the products for testing purposes.
+
+        # Pull every data point (title, price, etc.) out of the product tag in one pass.
+        # Missing fields get the default value from the site profile.
+        fields = plan.extract(product_tag)
+        title = fields['title']
+        url = fields['url']
+        if not url:
+            # Without a URL there is no product page to scrape and no id to dedup on.
+            logger.warning(f"Skipping a product listing without a URL ({title}).")
+            METRICS.increment('products_skipped_no_url')
+            continue
         # Ensure the URL has the correct protocol prefix.
         complete_url = url if url.startswith('https') else f"https://{url}"
 
-        # Check for and skip duplicate products based on their URL.
-        if any(prod['link'] == complete_url for prod in products_data):
-            print(f"Product with URL {complete_url} already exists. Skipping duplicate.")
-            continue  # Skip to the next iteration.
-
-        # This block calls an external function to scrape the detailed product page.
-        # It can be commented out to speed up testing or if not needed.
-        detailed_info = extract_detailed_product_info(complete_url)
-        material = detailed_info.get('material', 'Material not found')
-        description = detailed_info.get('description', 'Description not found')
-        product_category = detailed_info.get('product_category', 'Category not found')
-        additional_image_link = detailed_info.get('additional_image_link', [])
-        variant_options = detailed_info.get('variant_options', [{'color':"Not found",'size':"Not found","price" : "Not found","sale_price" : "Not found"}])
-        gender = detailed_info.get('gender', '')
-        
         # Generate a unique and consistent ID from the product URL.
         id = sha256(url.encode('utf-8')).hexdigest()
-        brand = brand_tag_element.get_text(strip=True) if brand_tag_element else "Brand Not Found"
-        price = price_tag_element.get_text(strip=True) if price_tag_element else "Price Not Found"
-        sale_price = sale_price_tag_element.get_text(strip=True) if sale_price_tag_element else "Sale Price Not Found"
-        image = image_tag_element.get_text(strip=True) if image_tag_element else "Image Not Found"
-
-        # Assemble the extracted data into a dictionary.
-        product = {
-            'id':id,'title': title, 
-            'link': url, 
-            'product_category':product_category,
-            'brand':brand,
-            'price': price,
-            'gender': gender,
-            'sale_price': sale_price,
+
+        # Skip products already scraped in this crawl (any category) or in an earlier run,
+        # and products already queued from this page. Both checks are O(1) set lookups.
+        if (seen_index is not None and id in seen_index) or id in queued_ids:
+            logger.info(f"Product with URL {complete_url} already exists. Skipping duplicate.")
+            METRICS.increment('products_skipped_duplicate')
+            continue  # Skip to the next iteration.
+        queued_ids.add(id)
+
+        brand = fields['brand']
+        price = fields['price']
+        sale_price = fields['sale_price']
+        image = fields['image']
+
+        # In incremental mode, only refetch products that changed or got too old.
+        fingerprint = listing_fingerprint(title, price, sale_price)
+        freshness_status = freshness.check(id, fingerprint) if freshness is not None else 'new'
+        if freshness_status == 'fresh':
+            logger.info(f"Product with URL {complete_url} is unchanged and recently scraped. Skipping.")
+            METRICS.increment('products_skipped_fresh')
+            continue
+
+        queued_products.append({
+            'id': id,
+            'complete_url': complete_url,
+            'url': url,
+            'title': title,
+            'brand': brand,
+            # Prices are stored as numbers (None if missing), so the checkpoint and work queue carry them as-is.
+            'price': parse_price(price),
+            'sale_price': parse_price(sale_price),
             'image': image,
-            'material' : material,
-            'description': description,
-            'additional_image_link': additional_image_link,
-            'variant_options': variant_options
-        }
-
-        # Add the product dictionary to our list for this run.
-        products_data.append(product)
-        # Append the new product record directly to the JSON file for persistence.
-        append_record(product)
+            'fingerprint': fingerprint,
+            # If the listing data changed, the color pages are refetched too instead of coming from the cache.
+            'refresh_variants': freshness_status == 'changed'
+        })
         count += 1
-        print(f"Extracted {count}/{len(product_listings)}: {title}")
+
+    return queued_products
+
+
+async def scrape_products(queued_products, scheduler, sink=None, seen_index=None, freshness=None, state=None, after=None):
+    """
+    Scrapes the product page of every queued product (from list_products) and writes one ProductRecord per product.
+    Products whose page could not be loaded are left out (and not marked as seen or done), so the returned
+    list can be shorter than queued_products.
+    Product and color pages are fetched through the crawl scheduler, which decides how many run at once
+    and how fast each host is hit; results keep the listing order.
+    Each record is written to sink as soon as it is ready (a 'data.jsonl' file if no sink is given).
+    With a crawl state, each record is flushed to disk before its product is marked done, so a resumed
+    crawl never loses or refetches a product.
+    after is an optional task (an earlier scrape_products call) to wait for before writing anything,
+    so consecutive batches keep the listing order while their product pages are fetched side by side.
+    """
+    # This list will store the product records of this batch.
+    products_data = []
+    # Without a shared index, only dedup within this page.
+    if seen_index is None:
+        seen_index = SeenIndex(path=None)
+    # Open our own output file if the caller didn't pass a sink in.
+    owns_sink = sink is None
+    if owns_sink:
+        sink = JsonlSink('data.jsonl')
+    # This calls an external function to scrape each detailed product page as a background task.
+    # It can be commented out to speed up testing or if not needed.
+    tasks = [
+        asyncio.create_task(extract_detailed_product_info(queued['complete_url'], scheduler, freshness=freshness,
+                                                          refresh_variants=queued['refresh_variants'], state=state))
+        for queued in queued_products
+    ]
+    try:
+        if after is not None:
+            # Wait for the earlier batch to finish writing; our product pages keep loading meanwhile.
+            await asyncio.wait([after])
+        # Collect the detail scrapes back in listing order.
+        for position, (queued, task) in enumerate(zip(queued_products, tasks), start=1):
+            try:
+                detailed_info = await task
+            except Exception as e:
+                # One broken product page must not stop the rest of the batch.
+                logger.error(f"Error scraping product page {queued['complete_url']}: {e}")
+                detailed_info = None
+            if detailed_info is None:
+                # Leave the product out: it isn't written, remembered as seen or checkpointed as done,
+                # so the next run tries it again (until the checkpoint gives up on it).
+                METRICS.increment('product_errors', url=queued['complete_url'])
+                if state is not None:
+                    state.fail(queued['complete_url'], 'product')
+                continue
+
+            # Combine the listing data and the product page details into one typed record.
+            product = ProductRecord.from_listing(queued, detailed_info)
+
+            # Add the product record to our list for this run.
+            products_data.append(product)
+            # Stream the new product record straight to the output sink for persistence.
+            append_record(product, sink)
+            # Remember the product so it is never fetched again (or, in incremental mode, until it goes stale).
+            seen_index.add(queued['id'])
+            if freshness is not None:
+                freshness.mark_fetched(queued['id'], queued['fingerprint'])
+            if state is not None:
+                # The record must be on disk before the checkpoint says the product is done.
+                sink.flush()
+                state.mark(queued['complete_url'], DONE, 'product')
+            logger.info(f"Extracted {position}/{len(queued_products)}: {queued['title']}")
+    finally:
+        # If we are leaving early (an error or cancellation), stop the product scrapes still running.
+        for task in tasks:
+            task.cancel()
+        if owns_sink:
+            sink.close()
+        else:
+            # Make sure this category's records are on disk before moving on.
+            sink.flush()
+        seen_index.flush()
 
     return products_data
 
+
+async def stream_product_data(page_url, scheduler, plan=None, sink=None, seen_index=None, freshness=None, state=None,
+                              batch_size=50, max_pending_batches=2):
+    """
+    Extracts the products of a listing page, for very long infinite-scroll categories too.
+    Product cards are read from the listing in batches of batch_size while it is still scrolling, and each
+    batch's product pages start loading straight away. At most max_pending_batches batches are being
+    scraped at once; the listing waits (keeping its place) until one finishes. Memory therefore depends on
+    the batch size, not on the size of the category. Records are written in listing order, as usual.
+    With a crawl state, every product is checkpointed as soon as its batch is read.
+    Returns the number of records written, or None if the listing gave no product cards at all.
+    """
+    plan = plan or load_site_profile()
+    if seen_index is None:
+        seen_index = SeenIndex(path=None)
+    # Every batch writes to the same sink, so open it here if the caller didn't pass one in.
+    owns_sink = sink is None
+    if owns_sink:
+        sink = JsonlSink('data.jsonl')
+    # Ids queued from this listing so far, shared by every batch.
+    queued_ids = set()
+    pending = deque()
+    previous = None
+    cards = 0
+    queued_total = 0
+    written = 0
+    try:
+        async with aclosing(scheduler.stream_listing(page_url, plan, batch_size=batch_size)) as batches:
+            async for batch in batches:
+                cards += len(batch)
+                queued_products = await asyncio.to_thread(list_products, "".join(batch), page_url, plan=plan,
+                                                          seen_index=seen_index, freshness=freshness, queued_ids=queued_ids)
+                if state is not None:
+                    # Products written before an interruption are already done, and products that kept failing are given up on.
+                    queued_products = [queued for queued in queued_products if state.status(queued['complete_url'], 'product') not in FINISHED]
+                if not queued_products:
+                    continue
+                if state is not None:
+                    state.add_pages(page_url, 'product', [(queued['complete_url'], queued) for queued in queued_products])
+                previous = asyncio.create_task(scrape_products(queued_products, scheduler, sink=sink, seen_index=seen_index,
+                                                               freshness=freshness, state=state, after=previous))
+                pending.append(previous)
+                queued_total += len(queued_products)
+                logger.info(f"Queued {len(queued_products)} more products from {page_url} ({queued_total} so far).")
+                # Keep memory bounded: let the oldest batch finish before reading more of the listing.
+                while len(pending) > max_pending_batches:
+                    written += len(await pending.popleft())
+                if queued_total >= MAX_PRODUCTS_PER_CATEGORY:
+                    break  # Limit the products for testing purposes, as in list_products.
+        while pending:
+            written += len(await pending.popleft())
+    finally:
+        # If we are leaving early (an error or cancellation), stop the batches still running.
+        for task in pending:
+            task.cancel()
+        if owns_sink:
+            sink.close()
+    if cards == 0:
+        logger.error(f"Error: no product cards came back from '{page_url}'.")
+        return None
+    return written
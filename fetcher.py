@@ -0,0 +1,356 @@
+# Import necessary libraries for fetching pages with or without a browser.
+import logging  # Used for levelled progress and error messages.
+import json  # Used for the URL index of recorded pages.
+import os  # Used to find recorded pages on disk.
+import threading  # Used so parallel workers can record pages safely.
+from hashlib import sha256  # Used to give each recorded page a unique filename.
+from html_parser import make_soup  # Used to check a fetched page has the content we need.
+from metrics import METRICS  # Records stage timings and counts for the run summary.
+from site_profile import load_site_profile  # Each page type's required selectors live in the site profile.
+from response_cache import CACHE_MODES  # How a CachingFetcher uses its page cache.
+from concurrent.futures import ThreadPoolExecutor  # Used to fetch several pages over HTTP at once.
+from scrape_url_script import scrape_specific_url, scrape_urls_in_tabs, stream_listing  # The Selenium (browser) way of fetching pages.
+
+logger = logging.getLogger(__name__)
+
+# The same User-Agent the browser sends, so both backends look alike to the website.
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
+
+# --- FETCH BACKENDS ---
+# Which backend each page type tries first. 'http' pages fall back to the browser
+# automatically if the plain HTML is missing the content we need.
+PAGE_BACKENDS = {
+    'home': 'http',
+    'listing': 'browser',
+    'product': 'browser',
+    'variant': 'http',
+}
+
+
+def listing_batches(html_content, plan, batch_size):
+    """
+    Splits a whole listing page into lists of up to batch_size product card snippets.
+    Yields nothing for a page that could not be fetched (None).
+    """
+    if html_content is None:
+        return
+    soup = make_soup(html_content, 'listing', regions=plan.listing_regions())
+    listings = plan.find_listings(soup)
+    for start in range(0, len(listings), batch_size):
+        yield [str(listing) for listing in listings[start:start + batch_size]]
+
+
+class Fetcher:
+    """
+    The common interface for fetching a page: give it a URL and a page type, get back the HTML (or None).
+    """
+
+    def fetch(self, url, page_type):
+        raise NotImplementedError
+
+    def fetch_many(self, urls, page_type):
+        """
+        Fetches several pages of the same type and returns their HTML in the same order.
+        Fetchers that can load pages side by side override this.
+        """
+        return [self.fetch(url, page_type) for url in urls]
+
+    def stream_listing(self, url, plan, batch_size=50):
+        """
+        Yields the product cards of a listing page as lists of up to batch_size HTML snippets.
+        This default fetches the whole page and splits it; the browser overrides it to read
+        the cards while it scrolls. Yields nothing if the page could not be fetched.
+        """
+        yield from listing_batches(self.fetch(url, 'listing'), plan, batch_size)
+
+    def close(self):
+        pass
+
+
+class BrowserFetcher(Fetcher):
+    """
+    Fetches pages with headless Chrome, borrowing browsers from the driver pool.
+    Needed for pages that only render their content with JavaScript.
+    """
+
+    def __init__(self, pool=None, plan=None):
+        self.pool = pool
+        # The site profile whose readiness selectors say when a page has loaded (the default one if None).
+        self.plan = plan
+
+    def fetch(self, url, page_type):
+        return scrape_specific_url(url, pool=self.pool, page_type=page_type, plan=self.plan)
+
+    def fetch_many(self, urls, page_type):
+        # Load the pages side by side in tabs of one browser instead of one browser each.
+        if len(urls) == 1:
+            return [self.fetch(urls[0], page_type)]
+        return scrape_urls_in_tabs(urls, pool=self.pool, page_type=page_type, plan=self.plan)
+
+    def stream_listing(self, url, plan, batch_size=50):
+        # Read the product cards from the browser while it scrolls, instead of the finished page.
+        return stream_listing(url, plan.listing_selector(), batch_size=batch_size, pool=self.pool, plan=plan)
+
+
+class HttpFetcher(Fetcher):
+    """
+    Fetches pages with plain HTTP requests over a pool of keep-alive connections.
+    Much cheaper than a browser, but only sees the server-rendered HTML. Requires the 'requests' package.
+    """
+
+    def __init__(self, timeout=15, pool_size=10):
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+        except ImportError:
+            raise ImportError("HttpFetcher needs the 'requests' package. Install it with: pip install requests")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        # One session reuses TCP/TLS connections between requests to the same host.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml'})
+
+    def fetch(self, url, page_type):
+        try:
+            logger.debug(f"Fetching {url} over HTTP...")
+            with METRICS.timer('http_fetch', url=url):
+                response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.warning(f"HTTP fetch of {url} returned status {response.status_code}.")
+                return None
+            METRICS.increment('http_pages', url=url)
+            METRICS.increment('html_bytes', len(response.content), url=url)
+            return response.text
+        except Exception as e:
+            logger.warning(f"HTTP fetch of {url} failed: {e}")
+            return None
+
+    def fetch_many(self, urls, page_type):
+        # The session's connection pool lets several requests to the same host run at once.
+        with ThreadPoolExecutor(max_workers=max(1, min(len(urls), self.pool_size))) as executor:
+            return list(executor.map(lambda url: self.fetch(url, page_type), urls))
+
+    def close(self):
+        self.session.close()
+
+
+def has_required_content(html_content, page_type, plan=None):
+    """
+    Checks that a page contains at least one of the readiness selectors the site profile
+    (plan, or the default one) gives its page type.
+    """
+    if not html_content:
+        return False
+    plan = plan or load_site_profile()
+    soup = make_soup(html_content, page_type, regions=plan.page_regions(page_type))
+    return any(soup.select_one(selector) for selector in plan.ready_selectors(page_type))
+
+
+class SiteFetcher(Fetcher):
+    """
+    Picks the backend for each page type. Pages set to 'http' are fetched without a browser first,
+    and fetched again with the browser if the plain HTML is missing the required selectors.
+    plan is the site profile those selectors come from (the default one if None).
+    """
+
+    def __init__(self, backends=None, pool=None, http_fetcher=None, browser_fetcher=None, plan=None):
+        self.backends = dict(PAGE_BACKENDS if backends is None else backends)
+        self.plan = plan
+        self.browser = browser_fetcher or BrowserFetcher(pool=pool, plan=plan)
+        self.http = http_fetcher
+        if self.http is None and 'http' in self.backends.values():
+            try:
+                self.http = HttpFetcher()
+            except ImportError as e:
+                # Without 'requests' every page simply goes through the browser.
+                logger.warning(f"{e}. Using the browser for every page.")
+
+    def fetch(self, url, page_type):
+        if self.backends.get(page_type) == 'http' and self.http is not None:
+            html_content = self.http.fetch(url, page_type)
+            if has_required_content(html_content, page_type, self.plan):
+                return html_content
+            logger.info(f"The plain HTML of {url} is missing the {page_type} content. Falling back to the browser.")
+            METRICS.increment('http_fallbacks', url=url)
+        return self.browser.fetch(url, page_type)
+
+    def fetch_many(self, urls, page_type):
+        if self.backends.get(page_type) != 'http' or self.http is None:
+            return self.browser.fetch_many(urls, page_type)
+        results = self.http.fetch_many(urls, page_type)
+        # Send every page whose plain HTML is missing the content to the browser in one batch.
+        missing = [index for index, html_content in enumerate(results) if not has_required_content(html_content, page_type, self.plan)]
+        if missing:
+            logger.info(f"The plain HTML of {len(missing)} {page_type} pages is missing the content. Falling back to the browser.")
+            for index in missing:
+                METRICS.increment('http_fallbacks', url=urls[index])
+            for index, html_content in zip(missing, self.browser.fetch_many([urls[index] for index in missing], page_type)):
+                results[index] = html_content
+        return results
+
+    def stream_listing(self, url, plan, batch_size=50):
+        if self.backends.get('listing') == 'http' and self.http is not None:
+            # Plain HTTP can't scroll, so split the fetched page (with the usual browser fallback).
+            return super().stream_listing(url, plan, batch_size)
+        return self.browser.stream_listing(url, plan, batch_size)
+
+    def close(self):
+        if self.http is not None:
+            self.http.close()
+        self.browser.close()
+
+
+class CachingFetcher(Fetcher):
+    """
+    Wraps another fetcher with an on-disk page cache (see response_cache.py), so re-running the
+    crawl while tuning selectors doesn't load the same pages again.
+    mode is 'record' (serve fresh copies, fetch and store the rest), 'replay' (serve cached copies
+    only, even stale ones, and never fetch) or 'bypass' (fetch everything live, leave the cache alone).
+    """
+
+    def __init__(self, inner, cache, mode='record'):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Use one of: {', '.join(CACHE_MODES)}.")
+        self.inner = inner
+        self.cache = cache
+        self.mode = mode
+
+    def _cached(self, url, page_type):
+        if self.mode == 'bypass':
+            return None
+        return self.cache.get(url, page_type, allow_stale=self.mode == 'replay')
+
+    def fetch(self, url, page_type):
+        return self.fetch_many([url], page_type)[0]
+
+    def fetch_many(self, urls, page_type):
+        results = [self._cached(url, page_type) for url in urls]
+        missing = [index for index, html_content in enumerate(results) if html_content is None]
+        if not missing or self.mode == 'replay':
+            for index in missing:
+                logger.warning(f"{urls[index]} is not in the page cache (replay mode, so it isn't fetched).")
+            return results
+        if len(missing) == 1:
+            fetched = [self.inner.fetch(urls[missing[0]], page_type)]
+        else:
+            fetched = self.inner.fetch_many([urls[index] for index in missing], page_type)
+        for index, html_content in zip(missing, fetched):
+            results[index] = html_content
+            if html_content is not None and self.mode == 'record':
+                self.cache.put(urls[index], page_type, html_content)
+        return results
+
+    def stream_listing(self, url, plan, batch_size=50):
+        # A cached listing is split from its stored copy. A live one is streamed as usual and isn't
+        # stored, since the full page is never built; crawl once without streaming to record listings.
+        html_content = self._cached(url, 'listing')
+        if html_content is None and self.mode != 'replay':
+            return self.inner.stream_listing(url, plan, batch_size)
+        return listing_batches(html_content, plan, batch_size)
+
+    def close(self):
+        self.cache.close()
+        self.inner.close()
+
+
+# The files the scraper used to write for each page type. A replay with no URL index
+# falls back to these, so old home.html/file.html/temp.html dumps can be replayed as-is.
+DEFAULT_FIXTURES = {
+    'home': 'home.html',
+    'listing': 'file.html',
+    'product': 'temp.html',
+    'variant': 'temp.html',
+}
+
+# The name of the URL index written next to recorded pages.
+FIXTURE_INDEX = 'urls.json'
+
+
+class RecordingFetcher(Fetcher):
+    """
+    Wraps another fetcher and saves every page it fetches into a fixtures folder,
+    together with a URL index, so the crawl can be replayed offline later.
+    """
+
+    def __init__(self, inner, fixtures_dir):
+        self.inner = inner
+        self.fixtures_dir = fixtures_dir
+        self._lock = threading.Lock()
+        os.makedirs(fixtures_dir, exist_ok=True)
+        self._index_path = os.path.join(fixtures_dir, FIXTURE_INDEX)
+        self._routes = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                self._routes = json.load(f)
+
+    def fetch(self, url, page_type):
+        return self._record(url, page_type, self.inner.fetch(url, page_type))
+
+    def fetch_many(self, urls, page_type):
+        return [self._record(url, page_type, html_content)
+                for url, html_content in zip(urls, self.inner.fetch_many(urls, page_type))]
+
+    def _record(self, url, page_type, html_content):
+        """
+        Saves one fetched page and its URL in the fixtures folder, then hands the HTML back.
+        """
+        if html_content is None:
+            return None
+        filename = f"{page_type}-{sha256(url.encode('utf-8')).hexdigest()[:16]}.html"
+        with open(os.path.join(self.fixtures_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        with self._lock:
+            self._routes[url] = {'page_type': page_type, 'file': filename}
+        return html_content
+
+    def close(self):
+        # Write the URL index once at the end rather than after every page.
+        with self._lock:
+            with open(self._index_path, 'w', encoding='utf-8') as f:
+                json.dump(self._routes, f, indent=4)
+        self.inner.close()
+
+
+class ReplayFetcher(Fetcher):
+    """
+    Serves pages from a fixtures folder instead of the network, for offline runs and benchmarks.
+    URLs in the folder's urls.json index get their recorded page. Any other URL gets the
+    default page for its type (home.html, file.html or temp.html), or None if there isn't one.
+    """
+
+    def __init__(self, fixtures_dir):
+        self.fixtures_dir = fixtures_dir
+        self._routes = {}
+        index_path = os.path.join(fixtures_dir, FIXTURE_INDEX)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self._routes = json.load(f)
+        # Pages are read from disk once and kept in memory, so replays measure our code and not the disk.
+        self._cache = {}
+        self._lock = threading.Lock()
+        # Simple counters the benchmark reads after a run.
+        self.pages_served = 0
+        self.bytes_served = 0
+
+    def _read(self, filename):
+        if filename not in self._cache:
+            path = os.path.join(self.fixtures_dir, filename)
+            if not os.path.exists(path):
+                self._cache[filename] = None
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._cache[filename] = f.read()
+        return self._cache[filename]
+
+    def fetch(self, url, page_type):
+        route = self._routes.get(url)
+        filename = route['file'] if route else DEFAULT_FIXTURES.get(page_type)
+        with self._lock:
+            html_content = self._read(filename) if filename else None
+            if html_content is not None:
+                self.pages_served += 1
+                self.bytes_served += len(html_content)
+        return html_content
@@ -0,0 +1,81 @@
+# Import necessary libraries for tracking when products were last scraped.
+import json  # Used to store cached colour variants.
+import sqlite3  # A small on-disk database that ships with Python.
+import threading  # Used so several workers can share one store safely.
+import time  # Used to timestamp each fetch.
+from hashlib import sha256  # Used to fingerprint the listing data.
+
+
+def listing_fingerprint(title, price, sale_price):
+    """
+    Builds a short fingerprint of the listing data. If the title or a price changes, so does the fingerprint.
+    """
+    # Missing values (None) count as empty text.
+    return sha256("\x1f".join(value or '' for value in [title, price, sale_price]).encode('utf-8')).hexdigest()[:16]
+
+
+class FreshnessStore:
+    """
+    Remembers when each product id was last fetched and the fingerprint of its listing data,
+    so an incremental crawl only refetches products that changed or got too old.
+    Colour variant pages are cached here too, keyed by their URL.
+    """
+
+    def __init__(self, path='freshness.db', ttl_seconds=24 * 60 * 60):
+        self.path = path
+        # Anything fetched longer ago than this is fetched again even if it looks unchanged.
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS products (id TEXT PRIMARY KEY, fingerprint TEXT, fetched_at REAL)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS variants (url TEXT PRIMARY KEY, payload TEXT, fetched_at REAL)")
+        self._connection.commit()
+
+    def _expired(self, fetched_at):
+        return time.time() - fetched_at >= self.ttl_seconds
+
+    def check(self, product_id, fingerprint):
+        """
+        Says whether a product needs fetching: 'fresh' (skip it), 'changed', 'expired' or 'new'.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT fingerprint, fetched_at FROM products WHERE id = ?", (product_id,)).fetchone()
+        if row is None:
+            return 'new'
+        if row[0] != fingerprint:
+            return 'changed'
+        if self._expired(row[1]):
+            return 'expired'
+        return 'fresh'
+
+    def mark_fetched(self, product_id, fingerprint):
+        """
+        Records that a product was just fetched with the given listing fingerprint.
+        """
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO products (id, fingerprint, fetched_at) VALUES (?, ?, ?)",
+                                     (product_id, fingerprint, time.time()))
+            self._connection.commit()
+
+    def get_variant(self, url):
+        """
+        Returns the cached variant details for a colour page, or None if there is none or it is too old.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT payload, fetched_at FROM variants WHERE url = ?", (url,)).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        return json.loads(row[0])
+
+    def put_variant(self, url, variant):
+        """
+        Caches the variant details scraped from a colour page.
+        """
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO variants (url, payload, fetched_at) VALUES (?, ?, ?)",
+                                     (url, json.dumps(variant), time.time()))
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,54 @@
+# Import necessary libraries for turning HTML into something we can search.
+import re  # Used to match several class names with one pattern.
+from bs4 import BeautifulSoup, SoupStrainer  # SoupStrainer limits parsing to the parts we need.
+from metrics import METRICS  # Records how long parsing takes.
+
+# Use the much faster lxml parser when it is installed, otherwise fall back to Python's built-in one.
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+
+def any_class_pattern(*class_names):
+    """
+    Builds a pattern that matches a class attribute containing any of the given class names.
+    It works whether the parser hands us the whole class string or one class at a time.
+    """
+    return re.compile(r'(?:^|\s)(?:' + '|'.join(re.escape(name) for name in class_names) + r')(?:\s|$)')
+
+
+# --- PARSE REGIONS ---
+# Each extractor only needs a few regions of its page. Parsing just those regions skips
+# building a tree for the rest of a multi-megabyte page. If the website's design changes,
+# these need to be kept in line with the selectors used by the extractors.
+# The homepage and category page regions come from the site profile instead
+# (ExtractionPlan.page_regions in site_profile.py), since the profile says where the links and cards are.
+
+# Colour variant pages: the colour name, the size chips and the hidden price/availability spans.
+VARIANT_REGIONS = SoupStrainer(class_=any_class_pattern('nw-color-name', 'nw-size-chip', 'nwc-hide'))
+
+# Product pages: the details accordion, breadcrumbs, thumbnails, colour links, and everything a variant needs.
+PRODUCT_REGIONS = SoupStrainer(class_=any_class_pattern(
+    'nw-pdp-desktopaccordiondetailssection', 'nw-breadcrumb-listitem', 'nw-thumbnail-imagelazy',
+    'nw-color-item', 'nw-color-name', 'nw-size-chip', 'nwc-hide'
+))
+
+PAGE_REGIONS = {
+    'product': PRODUCT_REGIONS,
+    'variant': VARIANT_REGIONS,
+}
+
+
+def make_soup(html_content, page_type=None, parser=None, regions=None):
+    """
+    Parses HTML with the fastest available parser.
+    Given a page_type ('product' or 'variant'), only the regions that page's extractor needs
+    are parsed. Leave page_type out to parse the whole page.
+    regions overrides the page type's default regions with a SoupStrainer of your own; homepages and
+    category pages get theirs from the site profile (plan.page_regions(page_type)).
+    """
+    parse_only = regions or (PAGE_REGIONS.get(page_type) if page_type else None)
+    with METRICS.timer(f"parse_{page_type or 'page'}"):
+        return BeautifulSoup(html_content or '', parser or DEFAULT_PARSER, parse_only=parse_only)
@@ -0,0 +1,150 @@
+# Import necessary libraries for recording how long each stage of the crawl takes.
+import json  # Used for the end-of-run JSON summary.
+import threading  # Used so worker threads can record metrics safely.
+import time  # Used to time each stage.
+from contextlib import contextmanager  # Lets callers time a block with a 'with' statement.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Used for the optional /metrics endpoint.
+
+# Every metric name in the Prometheus output starts with this.
+METRIC_PREFIX = 'scraper'
+
+
+class Metrics:
+    """
+    Collects counters (pages loaded, bytes of HTML, records written...) and stage timings
+    (driver startup, page loads, parsing...) for the whole crawl and for each URL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets everything recorded so far. Called at the start of each crawl.
+        """
+        with self._lock:
+            self.started_at = time.time()
+            # counter name -> total
+            self.counters = {}
+            # stage name -> {'count', 'total_ms', 'max_ms'}
+            self.timings = {}
+            # url -> {counter or stage name -> total}
+            self.per_url = {}
+
+    def increment(self, name, amount=1, url=None):
+        """
+        Adds amount to a counter, for the whole run and (if a URL is given) for that URL.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if url is not None:
+                url_metrics = self.per_url.setdefault(url, {})
+                url_metrics[name] = url_metrics.get(name, 0) + amount
+
+    def observe(self, stage, elapsed_ms, url=None):
+        """
+        Records that one run of a stage took elapsed_ms milliseconds.
+        """
+        with self._lock:
+            timing = self.timings.setdefault(stage, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            timing['count'] += 1
+            timing['total_ms'] += elapsed_ms
+            timing['max_ms'] = max(timing['max_ms'], elapsed_ms)
+            if url is not None:
+                url_metrics = self.per_url.setdefault(url, {})
+                key = f"{stage}_ms"
+                url_metrics[key] = url_metrics.get(key, 0.0) + elapsed_ms
+
+    @contextmanager
+    def timer(self, stage, url=None):
+        """
+        Times the body of a 'with' block as one run of a stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000, url=url)
+
+    def summary(self):
+        """
+        Returns everything recorded so far as a plain dictionary.
+        """
+        with self._lock:
+            stages = {}
+            for stage, timing in self.timings.items():
+                stages[stage] = dict(timing, avg_ms=timing['total_ms'] / timing['count'] if timing['count'] else 0.0)
+            return {
+                'run_seconds': time.time() - self.started_at,
+                'counters': dict(self.counters),
+                'stages': stages,
+                'urls': {url: dict(values) for url, values in self.per_url.items()},
+            }
+
+    def export_json(self, path):
+        """
+        Writes the run summary to a JSON file.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=4)
+        return path
+
+    def prometheus_text(self):
+        """
+        Formats the run-wide counters and stage timings in the Prometheus text format.
+        Per-URL numbers are left out to keep the number of series small.
+        """
+        summary = self.summary()
+        lines = []
+        for name, value in sorted(summary['counters'].items()):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        if summary['stages']:
+            metric = f"{METRIC_PREFIX}_stage_duration_milliseconds"
+            lines.append(f"# TYPE {metric} summary")
+            for stage, timing in sorted(summary['stages'].items()):
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {timing["total_ms"]:.3f}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {timing["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path):
+        """
+        Writes the Prometheus text to a file (for example for node_exporter's textfile collector).
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        return path
+
+
+# The metrics for the current process. Every module records into this one object.
+METRICS = Metrics()
+
+
+def serve_prometheus(port=9108, metrics=METRICS, host='127.0.0.1'):
+    """
+    Serves the metrics at http://<host>:<port>/metrics on a background thread. Returns the server;
+    call shutdown() on it to stop.
+    Only this machine can reach it by default; pass host='0.0.0.0' to let a Prometheus server elsewhere scrape it.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep scrapes of the endpoint out of the crawl's log.
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
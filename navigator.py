@@ -1,109 +1,306 @@
 # Import the necessary functions from other project scripts.
-from extract_product_information import extract_product_data
-from scrape_url_script import scrape_specific_url
-from bs4 import BeautifulSoup
+import logging # Used for levelled progress and error messages.
+import asyncio # The crawl runs as coroutines on an event loop.
+from extract_product_information import list_products, scrape_products, stream_product_data
+from scrape_url_script import configure_driver_pool, close_driver_pool
+from fetcher import SiteFetcher, CachingFetcher, PAGE_BACKENDS
+from response_cache import ResponseCache
+from artifacts import configure_artifacts, dump_artifact
+from resource_blocking import configure_resource_blocking
+from output_sink import open_sink, export_json
+from seen_index import SeenIndex
+from freshness import FreshnessStore
+from html_parser import make_soup
+from site_profile import load_site_profile, DEFAULT_SITE_PROFILE
+from metrics import METRICS, serve_prometheus
+from crawl_scheduler import CrawlScheduler
+from crawl_state import CrawlState, DONE, FAILED, FINISHED, IN_PROGRESS, PENDING
 
-def navigate_to_page():
+logger = logging.getLogger(__name__)
+
+def navigate_to_page(
+        # Browsers and workers.
+        pool_size=2,
+        max_pages_per_driver=50,
+        max_workers=1,
+        block_resources=True,
+        # Where the data comes from.
+        site_profile=DEFAULT_SITE_PROFILE,
+        page_backends=PAGE_BACKENDS,
+        fetcher=None,
+        # Politeness and retries.
+        requests_per_second=1.0,
+        burst=2,
+        max_retries=3,
+        # Output.
+        output_path='data.jsonl',
+        json_export_path='data.json',
+        dump_artifacts=False,
+        # Dedup and incremental crawls.
+        seen_index_path='seen_products.db',
+        incremental=False,
+        freshness_ttl_hours=24,
+        freshness_path='freshness.db',
+        # Checkpointing.
+        state_path='crawl_state.db',
+        resume=True,
+        # Streamed listings.
+        stream_listings=False,
+        stream_batch_size=50,
+        # Page cache.
+        cache_mode=None,
+        cache_dir='page_cache',
+        cache_ttl_hours=24,
+        cache_max_mb=500,
+        # Metrics.
+        metrics_path='metrics.json',
+        prometheus_path=None,
+        metrics_port=None,
+        metrics_host='127.0.0.1',
+):
     """
     Finds category links on a homepage, navigates to each,
     and initiates the data extraction process.
+    All pages are loaded with browsers borrowed from one shared pool,
+    which is closed once the crawl is finished.
+    Every page goes through a crawl scheduler: max_workers sets how many pages are fetched at the
+    same time, each host gets at most requests_per_second requests per second (with bursts of up to
+    burst; None turns the limit off), and a failed page is retried up to max_retries times with backoff.
+    dump_artifacts saves raw and prettified copies of every page under 'artifacts/' for debugging.
+    Records are streamed to output_path (.jsonl, .csv or .parquet); a JSONL output is also
+    exported to a single JSON array at json_export_path when the crawl ends (None to skip).
+    Products already listed in seen_index_path (from this or earlier runs) are never fetched
+    again; pass seen_index_path=None to only dedup within this run.
+    With incremental=True, a product is fetched again when its listing data (title, price,
+    sale price) changes or its last fetch is older than freshness_ttl_hours, and the seen index
+    only dedups within this run.
+    site_profile is the JSON file describing where the data lives on the target website.
+    page_backends picks 'http' or 'browser' for each page type; 'http' pages fall back to the
+    browser when the plain HTML is missing the content we need.
+    Progress is checkpointed in state_path after every page. If a crawl is interrupted, the next call
+    resumes where it stopped without fetching finished pages again; resume=False starts from the
+    homepage instead. A page that fails in crawl_state.MAX_ATTEMPTS runs is given up on, and the checkpoint
+    is cleared once every page is done or given up on. state_path=None keeps the checkpoint in memory only.
+    With block_resources the browser skips images, fonts, media and tracking scripts that the
+    page type doesn't need (see resource_blocking.py).
+    With stream_listings=True, category pages are read in batches of stream_batch_size product cards
+    while they scroll, and each batch's product pages start loading straight away, so memory stays
+    bounded on very long categories (see stream_product_data).
+    Pass your own fetcher (for example a ReplayFetcher over saved pages) to replace the live one.
+    cache_mode turns on the page cache in cache_dir: 'record' serves pages fetched within cache_ttl_hours
+    from the cache and stores the rest, 'replay' only serves cached pages (however old) and never fetches,
+    and 'bypass' fetches everything live. The cache keeps at most cache_max_mb of compressed HTML.
+    Stage timings and counts are written to metrics_path as JSON when the crawl ends, and in the
+    Prometheus text format to prometheus_path if given. With metrics_port they are also served live
+    at http://<metrics_host>:<metrics_port>/metrics while the crawl runs (on this machine only by default).
     """
-    # The base URL of the target website.
-    base_url = "https://www.nnnow.com"
+    # Start a fresh set of metrics for this crawl.
+    METRICS.reset()
+    metrics_server = serve_prometheus(metrics_port, host=metrics_host) if metrics_port else None
+    # Load and compile the selector configuration once for the whole crawl.
+    plan = load_site_profile(site_profile)
+    configure_artifacts(enabled=dump_artifacts)
+    configure_resource_blocking(enabled=block_resources)
+    # Start the shared browser pool for this crawl. Every worker needs a browser of its own,
+    # and a streamed listing keeps one more for as long as it scrolls.
+    configure_driver_pool(size=max(pool_size, max_workers + (1 if stream_listings else 0)), max_pages_per_driver=max_pages_per_driver)
+    sink = open_sink(output_path)
+    # One index shared by every category, so a product listed under several categories is scraped once.
+    # In incremental mode the freshness store decides what to refetch across runs instead.
+    seen_index = SeenIndex(path=None if incremental else seen_index_path)
+    freshness = FreshnessStore(path=freshness_path, ttl_seconds=freshness_ttl_hours * 3600) if incremental else None
+    # Which pages are pending, in progress or done, saved after every step.
+    state = CrawlState(path=state_path)
+    if not resume:
+        state.clear()
+    # Fetches each page with plain HTTP or the browser, depending on its page type.
+    owns_fetcher = fetcher is None
+    if owns_fetcher:
+        fetcher = SiteFetcher(backends=page_backends, plan=plan)
+    if cache_mode:
+        # Serve pages from the on-disk cache where possible (see response_cache.py).
+        cache = ResponseCache(directory=cache_dir, ttl_seconds=cache_ttl_hours * 3600, max_bytes=cache_max_mb * 1024 * 1024, plan=plan)
+        fetcher = CachingFetcher(fetcher, cache, mode=cache_mode)
+    # Every page fetch goes through one scheduler, which keeps the crawl polite and the workers busy.
+    scheduler = CrawlScheduler(fetcher, max_concurrency=max_workers, requests_per_second=requests_per_second,
+                               burst=burst, max_retries=max_retries)
+    try:
+        asyncio.run(_navigate_to_page(plan, scheduler, sink, seen_index, freshness, state,
+                                      stream_batch_size=stream_batch_size if stream_listings else None))
+        unfinished = state.unfinished()
+        if unfinished:
+            logger.info(f"Crawl stopped with unfinished pages {unfinished}. Run again to carry on.")
+        elif len(state):
+            # Everything is done, so the next run starts a fresh crawl.
+            state.clear()
+    finally:
+        # Close every pooled browser, the output file and the index, even if the crawl failed halfway.
+        close_driver_pool()
+        if owns_fetcher:
+            fetcher.close()
+        elif cache_mode:
+            # Close the cache but leave the caller's own fetcher open.
+            fetcher.cache.close()
+        sink.close()
+        seen_index.close()
+        if freshness is not None:
+            freshness.close()
+        state.close()
+        # Write out the run's timings and counts, even if the crawl failed halfway.
+        _export_metrics(metrics_path, prometheus_path)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    if json_export_path and output_path.endswith('.jsonl'):
+        export_json(output_path, json_export_path)
 
+def _export_metrics(metrics_path, prometheus_path):
+    """
+    Writes the metrics files and logs a one-line summary of the run.
+    """
+    summary = METRICS.summary()
+    counters = summary['counters']
+    logger.info(f"Run finished in {summary['run_seconds']:.1f}s: {counters.get('pages_loaded', 0) + counters.get('http_pages', 0)} pages, "
+                f"{counters.get('driver_launches', 0)} browser launches, {counters.get('records_written', 0)} records written.")
+    if metrics_path:
+        METRICS.export_json(metrics_path)
+        logger.info(f"Saved run metrics to '{metrics_path}'.")
+    if prometheus_path:
+        METRICS.export_prometheus(prometheus_path)
 
-    # To get fresh category links, uncomment the line below occasionally.
-    # This will re-scrape the homepage and save it.
-    scrape_specific_url(base_url, "home.html")
-    
-    # Read the locally saved homepage HTML to find navigation links.
-    with open("home.html", 'r', encoding='utf-8') as f:
-            html_content = f.read()
-    # Parse the homepage content.
-    soup = BeautifulSoup(html_content, 'html.parser')
-    with open("home_pretty.html", 'w', encoding='utf-8') as f:
-            f.write(soup.prettify())
-    # Find all the anchor tags that correspond to second-level category pages.
-    navigation_pages = soup.find_all('a', class_='nw-navtreev2-link nw-navtreev2-link-level2')
+def _finish_category(state, complete_page_url):
+    """
+    Marks a category done once all of its products are done or given up on. Products whose page failed
+    to load keep it in progress, so the next run resumes the category and tries just those products again.
+    """
+    statuses = [status for _, status, _ in state.children(complete_page_url, 'product')]
+    unfinished = [status for status in statuses if status not in FINISHED]
+    if unfinished:
+        state.mark(complete_page_url, IN_PROGRESS, 'listing')
+        logger.warning(f"{len(unfinished)} product pages from {complete_page_url} failed. They will be retried on the next run.")
+    else:
+        state.mark(complete_page_url, DONE, 'listing')
+        if FAILED in statuses:
+            logger.warning(f"Gave up on {statuses.count(FAILED)} product pages from {complete_page_url} after repeated failures.")
 
-    # The filename for storing the HTML of category pages.
-    HTML_FILE = 'file.html'
+def _listing_failed(state, complete_page_url):
+    """
+    Records that a category page could not be loaded: it is tried again on the next run, until it has failed too often.
+    """
+    if state.fail(complete_page_url, 'listing') == FAILED:
+        logger.error(f"Could not load {complete_page_url}. Giving up on it after repeated failures.")
+    else:
+        logger.error(f"Could not load {complete_page_url}. It will be retried on the next run.")
 
-    print(f"Found {len(navigation_pages)} category links.")
-    print("Category Links:")
-    # Print the discovered links for verification.
-    for link in navigation_pages:
-        print(f" - {link.get_text(strip=True)}: {link.get('href')}")
+async def _navigate_to_page(plan, scheduler, sink, seen_index, freshness, state, stream_batch_size=None):
+    """
+    Does the actual crawl for navigate_to_page() once the browser pool is ready.
+    """
+    async with scheduler:
+        await _crawl_site(plan, scheduler, sink, seen_index, freshness, state, stream_batch_size)
+
+async def _crawl_site(plan, scheduler, sink, seen_index, freshness, state, stream_batch_size=None):
+    """
+    Fetches the homepage, then every category page, and extracts the products from each.
+    Every step is checkpointed in the crawl state, so an interrupted crawl picks up where it stopped.
+    With a stream_batch_size, category pages are streamed instead of read whole.
+    """
+    # The base URL of the target website.
+    base_url = plan.base_url
+
+    if state.status(base_url, 'home') == DONE:
+        # The category links were saved by an earlier, interrupted run.
+        logger.info(f"Resuming the previous crawl ({sum(state.unfinished().values())} pages left).")
+    else:
+        # Scrape the homepage to get fresh category links. The HTML is handed back directly.
+        html_content = await scheduler.fetch(base_url, 'home')
+        if html_content is None:
+            logger.error("Could not load the homepage. Nothing to crawl.")
+            return
+        # Parse only the category links from the homepage.
+        soup = make_soup(html_content, 'home', regions=plan.navigation_regions())
+        # Save a prettified copy for debugging, only if artifact dumping is enabled.
+        dump_artifact(base_url, 'pretty', soup=soup)
+        # Find all the anchor tags that correspond to second-level category pages.
+        navigation_pages = plan.find_navigation_links(soup)
+
+        logger.info(f"Found {len(navigation_pages)} category links.")
+        logger.debug("Category Links:")
+        # Print the discovered links for verification.
+        for link in navigation_pages:
+            logger.debug(f" - {link.get_text(strip=True)}: {link.get('href')}")
+
+        # Save every category as pending before starting on the first one.
+        category_urls = []
+        for link in navigation_pages:
+            # Get the relative URL from the anchor tag and construct the full, absolute URL.
+            page_url = link.get('href','')
+            category_urls.append((page_url if page_url.startswith('https') else f"https://{page_url}", None))
+        state.add_pages(base_url, 'listing', category_urls)
+        state.mark(base_url, DONE, page_type='home')
 
-    # --- SCRAPER CONFIGURATION ---
-    # This section defines the specific HTML tags, classes, and attributes
-    # needed to find product data on the target website. If the website's
-    # design changes, these values will need to be updated.
-    CLASS_LIST = ["nwc-grid-col", "nwc-grid-col-xs-6", "nwc-grid-col-sm-4", "nw-productlist-eachproduct"]
-    PRODUCT_URL_TAG = 'div'
-    PRODUCT_URL_CLASS = 'nwc-hide' 
-    PRODUCT_URL_DICT = {"itemprop" : "url"}
-    ATTR_DICT = {"itemprop": "itemListElement"}
-    PRODUCT_TITLE_TAG = 'div'
-    PRODUCT_TITLE_CLASS = 'nw-productview-producttitle'
-    PRODUCT_BRAND_CLASS = 'nw-productview-brandtxt'
-    PRODUCT_BRAND_TAG = 'h3'
-    PRODUCT_SALE_PRICE_TAG = 'span'
-    PRODUCT_SALE_PRICE_CLASS = ["nw-priceblock-amt", "nw-priceblock-sellingprice", "is-having-discount"]
-    PRODUCT_PRICE_TAG = 'del'
-    PRODUCT_PRICE_CLASS = ["nw-priceblock-amt", "nw-priceblock-mrp", "is-having-discount"]
-    PRODUCT_IMAGE_TAG = 'div'
-    PRODUCT_IMAGE_CLASS = 'nwc-hide'
-    PRODUCT_IMAGE_DICT = {"itemprop": "image"}
-    pretty_filepath = "file_pretty.html"
-    
     count = 0
 
     # Loop through each category page found.
-    for page in navigation_pages:
+    categories = state.children(base_url, 'listing')
+    for position, (complete_page_url, status, _) in enumerate(categories):
+        if status in FINISHED:
+            continue  # Finished (or given up on) in an earlier run.
         if count >= 1:
-            break  # Limit to the first category page for testing.
-        
-        # Get the relative URL from the anchor tag.
-        page_url = page.get('href','')
-        # Construct the full, absolute URL.
-        complete_page_url = page_url if page_url.startswith('https') else f"https://{page_url}"
-        print(f"Navigating to category page: {complete_page_url}")
+            # Limit to the first category page for testing. The categories left out are forgotten rather than
+            # left pending, so a run that finishes its category clears the checkpoint and the next run
+            # starts from the homepage again.
+            state.forget([url for url, later_status, _ in categories[position:] if later_status == PENDING], 'listing')
+            break
+
+        if status == IN_PROGRESS:
+            # The category's products were saved before the interruption; carry on with the unfinished ones.
+            queued_products = [payload for _, product_status, payload in state.children(complete_page_url, 'product')
+                               if product_status not in FINISHED]
+            logger.info(f"Resuming category page: {complete_page_url} ({len(queued_products)} products left)")
+        elif stream_batch_size:
+            logger.info(f"Streaming category page: {complete_page_url}")
+            # Products are checkpointed batch by batch. The category stays pending until the stream ends,
+            # so an interrupted one is streamed again and the products already written are skipped.
+            written = await stream_product_data(complete_page_url, scheduler, plan=plan, sink=sink, seen_index=seen_index,
+                                                freshness=freshness, state=state, batch_size=stream_batch_size)
+            if written is None:
+                _listing_failed(state, complete_page_url)
+            else:
+                logger.info(f"Successfully extracted data for {written} items from {complete_page_url}.")
+                _finish_category(state, complete_page_url)
+            count += 1
+            continue
+        else:
+            logger.info(f"Navigating to category page: {complete_page_url}")
+            # Scrape the full HTML of the category page.
+            category_html = await scheduler.fetch(complete_page_url, 'listing')
+            if category_html is None:
+                # Leave it pending so the next run tries it again (until it has failed too often).
+                _listing_failed(state, complete_page_url)
+                count += 1
+                continue
+            # Read the product cards and checkpoint the products to scrape. Parsing runs on a worker thread.
+            queued_products = await asyncio.to_thread(list_products, category_html, complete_page_url, plan=plan,
+                                                      seen_index=seen_index, freshness=freshness)
+            state.add_pages(complete_page_url, 'product', [(queued['complete_url'], queued) for queued in queued_products])
+            state.mark(complete_page_url, IN_PROGRESS, 'listing')
 
-        # Scrape the full HTML of the category page.
-        scrape_specific_url(complete_page_url, HTML_FILE)
-        
-        # Call the extraction function with the scraped HTML and the configuration.
-        extracted_data = extract_product_data(
-            html_filepath=HTML_FILE,
-            class_list=CLASS_LIST,
-            url_tag=PRODUCT_URL_TAG,
-            url_class=PRODUCT_URL_CLASS,
-            attr_url_dictionary=PRODUCT_URL_DICT,
-            attributes_dictionary= ATTR_DICT,
-            title_tag=PRODUCT_TITLE_TAG,
-            title_class=PRODUCT_TITLE_CLASS,
-            product_sale_price_tag=PRODUCT_SALE_PRICE_TAG,
-            product_sale_price_class=PRODUCT_SALE_PRICE_CLASS,
-            product_price_tag=PRODUCT_PRICE_TAG,
-            product_price_class=PRODUCT_PRICE_CLASS,
-            product_brand_tag=PRODUCT_BRAND_TAG,
-            product_brand_class=PRODUCT_BRAND_CLASS,
-            product_image_tag=PRODUCT_IMAGE_TAG,
-            product_image_class=PRODUCT_IMAGE_CLASS,
-            product_image_dict=PRODUCT_IMAGE_DICT,
-            pretty_filepath=pretty_filepath
-        )
+        # Scrape every product page and write the records.
+        extracted_data = await scrape_products(queued_products, scheduler, sink=sink, seen_index=seen_index,
+                                               freshness=freshness, state=state)
+        _finish_category(state, complete_page_url)
         # Check if any data was returned.
         if extracted_data:
-            print(f"\nSuccessfully extracted data for {len(extracted_data)} items from {complete_page_url}.")
+            logger.info(f"Successfully extracted data for {len(extracted_data)} items from {complete_page_url}.")
             # Print a few items as a sample to verify the results.
             for item in extracted_data[:5]:
-                print(f"Name: {item['title']} \n URL: {item['link']} \n Price: {item['price']} \n Sale Price: {item['sale_price']} \n Image: {item['image']} \n Material: {item['material']} \n Description: {item['description']} \n Additional Images: {item['additional_image_link']} \n Variant Options: {item['variant_options']} \n Product Category: {item['product_category']} \n Gender: {item['gender']} \n")
+                logger.debug(f"Name: {item.title} \n URL: {item.link} \n Price: {item.price} \n Sale Price: {item.sale_price} \n Image: {item.image} \n Material: {item.material} \n Description: {item.description} \n Additional Images: {item.additional_image_link} \n Variant Options: {item.variant_options} \n Product Category: {item.product_category} \n Gender: {item.gender} \n")
         else:
-            print(f"No data extracted from {complete_page_url}.")
+            logger.warning(f"No data extracted from {complete_page_url}.")
         count += 1
     
 # This ensures the script runs automatically when executed from the command line.
 if __name__ == "__main__":
+    # Show progress messages; use logging.DEBUG for the full scroll-by-scroll detail.
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     navigate_to_page()
@@ -0,0 +1,292 @@
+# Import necessary libraries for streaming scraped records to disk.
+import logging  # Used for levelled progress and error messages.
+import csv  # Used by the CSV writer.
+import json  # Used to serialise each record.
+import os  # Used to force buffered data onto the disk with fsync.
+import sqlite3  # Used by the shared SQLite writer.
+import threading  # Used so several workers can share one sink safely.
+import time  # Used to timestamp rows in the SQLite writer.
+
+logger = logging.getLogger(__name__)
+
+
+class OutputSink:
+    """
+    The common interface for every output writer: write records one at a time, then close.
+    Sinks can be used in a 'with' block so they are always flushed and closed.
+    """
+
+    def write(self, record):
+        """
+        Writes one record: a ProductRecord (or anything with to_dict()) or a plain dictionary.
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _as_dict(record):
+    """
+    Turns a typed record (a ProductRecord) into a plain dictionary; dictionaries pass through.
+    """
+    return record.to_dict() if hasattr(record, 'to_dict') else record
+
+
+def _flatten(record):
+    """
+    Turns nested lists and dictionaries into JSON strings so they fit in one CSV/Parquet cell.
+    """
+    return {key: json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+            for key, value in record.items()}
+
+
+class JsonlSink(OutputSink):
+    """
+    Appends one JSON record per line. Writing a record never rereads the file,
+    and a crash can lose at most the last unflushed batch instead of the whole file.
+    """
+
+    def __init__(self, path='data.jsonl', batch_size=50):
+        self.path = path
+        # Records are buffered in memory and written + fsynced once per batch.
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        # If an earlier run crashed mid-line, start on a fresh line so the new records stay readable.
+        if self._ends_mid_line(path):
+            self._file.write("\n")
+
+    @staticmethod
+    def _ends_mid_line(path):
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def write(self, record):
+        with self._lock:
+            self._buffer.append(json.dumps(_as_dict(record), ensure_ascii=False))
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._buffer = []
+        # Push the batch out of Python's buffer and onto the disk.
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush_locked()
+            self._file.close()
+
+
+class CsvSink(OutputSink):
+    """
+    Writes one CSV row per record. Nested fields such as variant_options are stored as JSON strings.
+    """
+
+    def __init__(self, path='data.csv', fieldnames=None):
+        self.path = path
+        self.fieldnames = fieldnames
+        self._lock = threading.Lock()
+        # Only write a header if we are starting a new file.
+        self._needs_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', encoding='utf-8', newline='')
+        self._writer = None
+
+    def write(self, record):
+        record = _as_dict(record)
+        with self._lock:
+            if self._writer is None:
+                # Use the first record's keys as the columns unless they were given up front.
+                self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames or list(record.keys()), extrasaction='ignore')
+                if self._needs_header:
+                    self._writer.writeheader()
+            self._writer.writerow(_flatten(record))
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class ParquetSink(OutputSink):
+    """
+    Writes records to a Parquet file in row groups of batch_size. Requires the optional 'pyarrow' package.
+    """
+
+    def __init__(self, path='data.parquet', batch_size=1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("ParquetSink needs the 'pyarrow' package. Install it with: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self._buffer.append(_flatten(_as_dict(record)))
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        table = self._pa.Table.from_pylist(self._buffer)
+        if self._writer is None:
+            # The first batch decides the schema of the file.
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self._buffer = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+class SqliteSink(OutputSink):
+    """
+    Stores one row per product in a SQLite file, keyed on the product's sha256 'id'.
+    Several crawler processes can write to the same file at once, and a product written by
+    one of them is never stored twice. Records are committed in batches of batch_size.
+    """
+
+    def __init__(self, path='data.db', batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        # The timeout makes a writer wait for another process's commit instead of failing.
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # WAL lets readers carry on while another process writes.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS products (id TEXT PRIMARY KEY, record TEXT, written_at REAL)")
+        self._connection.commit()
+
+    def write(self, record):
+        with self._lock:
+            record = _as_dict(record)
+            self._buffer.append((record['id'], json.dumps(record, ensure_ascii=False), time.time()))
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        # INSERT OR IGNORE keeps the first copy of a product if another worker already stored it.
+        self._connection.executemany("INSERT OR IGNORE INTO products (id, record, written_at) VALUES (?, ?, ?)", self._buffer)
+        self._connection.commit()
+        self._buffer = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._flush_locked()
+            finally:
+                self._connection.close()
+
+
+def open_sink(path):
+    """
+    Picks the right sink for a filename based on its extension (.jsonl, .csv, .parquet or .db).
+    """
+    if path.endswith('.csv'):
+        return CsvSink(path)
+    if path.endswith('.parquet'):
+        return ParquetSink(path)
+    if path.endswith(('.db', '.sqlite')):
+        return SqliteSink(path)
+    return JsonlSink(path)
+
+
+def export_json(jsonl_path='data.jsonl', json_path='data.json'):
+    """
+    Converts a JSONL file into a single pretty-printed JSON array, one record at a time.
+    Run it at the end of a crawl if you need the old data.json format.
+    """
+    count = 0
+    # Write to a temporary file first so a crash never leaves a half-written data.json behind.
+    temp_path = json_path + '.tmp'
+    with open(jsonl_path, 'r', encoding='utf-8') as source, open(temp_path, 'w', encoding='utf-8') as target:
+        target.write('[')
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a half-written last line; skip it.
+                logger.warning(f"Skipping an unreadable line in '{jsonl_path}'.")
+                continue
+            target.write(',\n' if count else '\n')
+            target.write(json.dumps(record, indent=4, ensure_ascii=False))
+            count += 1
+        target.write('\n]\n' if count else ']\n')
+    os.replace(temp_path, json_path)
+    logger.info(f"Exported {count} records from '{jsonl_path}' to '{json_path}'.")
+    return count
+
+
+def export_sqlite_jsonl(db_path='data.db', jsonl_path='data.jsonl'):
+    """
+    Writes every product stored by SqliteSink to a JSONL file, in the order they were stored.
+    """
+    count = 0
+    # Write to a temporary file first so a crash never leaves a half-written file behind.
+    temp_path = jsonl_path + '.tmp'
+    connection = sqlite3.connect(db_path)
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as target:
+            for (record,) in connection.execute("SELECT record FROM products ORDER BY rowid"):
+                target.write(record + "\n")
+                count += 1
+    finally:
+        connection.close()
+    os.replace(temp_path, jsonl_path)
+    logger.info(f"Exported {count} records from '{db_path}' to '{jsonl_path}'.")
+    return count
@@ -0,0 +1,154 @@
+# Import necessary libraries for waiting on page events instead of fixed sleeps.
+import logging  # Used for levelled progress and error messages.
+import time  # Used for timing out and short polling intervals.
+import copy  # Used to give a shared profile the selectors of one site.
+from selenium.webdriver.common.by import By  # Used to look up elements by CSS selector.
+from selenium.webdriver.support.ui import WebDriverWait  # Polls the page until a condition is met.
+from selenium.common.exceptions import TimeoutException  # Raised when a wait runs out of time.
+from site_profile import load_site_profile  # The site profile says which selectors mean a page is ready.
+
+logger = logging.getLogger(__name__)
+
+# How often the polling helpers below check the page, in seconds.
+POLL_INTERVAL = 0.1
+
+# JavaScript that records the time of the latest DOM change, so we can tell when the page has gone quiet.
+MUTATION_OBSERVER_SCRIPT = """
+if (!window.__scraperObserver) {
+    window.__scraperLastMutation = performance.now();
+    window.__scraperObserver = new MutationObserver(function () {
+        window.__scraperLastMutation = performance.now();
+    });
+    window.__scraperObserver.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+}
+"""
+
+
+class ReadinessProfile:
+    """
+    Describes what "ready" means for one type of page and how long to wait for each signal.
+    """
+
+    def __init__(self, selectors=None, selector_timeout=10, network_idle_ms=500, network_timeout=5,
+                 dom_quiet_ms=300, dom_timeout=5, scroll=False, scroll_timeout=2.5, max_no_change_scrolls=2):
+        # CSS selectors that must appear before the page is useful to us (any one of them is enough).
+        # They depend on the website, so get_readiness_profile() fills them in from the site profile.
+        self.selectors = list(selectors or [])
+        self.selector_timeout = selector_timeout
+        # How long the page must go without finishing a network request to count as idle.
+        self.network_idle_ms = network_idle_ms
+        self.network_timeout = network_timeout
+        # How long the page must go without a DOM change to count as settled.
+        self.dom_quiet_ms = dom_quiet_ms
+        self.dom_timeout = dom_timeout
+        # Whether this page loads more content as it is scrolled (infinite scroll).
+        self.scroll = scroll
+        # The longest we wait for new content after each scroll.
+        self.scroll_timeout = scroll_timeout
+        # Stop scrolling after this many scrolls in a row that loaded nothing new.
+        self.max_no_change_scrolls = max_no_change_scrolls
+
+
+# --- READINESS PROFILES ---
+# One profile per page type: how long to wait for each signal and whether to scroll.
+# The selectors to wait for are part of the site profile ("readiness" in site_profiles/nnnow.json).
+READINESS_PROFILES = {
+    # The homepage only needs the navigation tree.
+    'home': ReadinessProfile(),
+    # Category pages load products as you scroll.
+    'listing': ReadinessProfile(scroll=True),
+    # Product pages are complete once the details are rendered, so no scrolling is needed.
+    'product': ReadinessProfile(),
+    # Colour variant pages are only read for their size chips and prices.
+    'variant': ReadinessProfile(),
+}
+
+
+def get_readiness_profile(page_type, plan=None):
+    """
+    Looks up the readiness profile for a page type, defaulting to the listing profile, with the
+    selectors from the site profile (plan, or the default site profile if none is given).
+    """
+    plan = plan or load_site_profile()
+    profile = copy.copy(READINESS_PROFILES.get(page_type, READINESS_PROFILES['listing']))
+    profile.selectors = list(plan.ready_selectors(page_type))
+    return profile
+
+
+def wait_for_selectors(driver, selectors, timeout):
+    """
+    Waits until at least one of the selectors matches an element on the page.
+    """
+    if not selectors:
+        # Nothing to wait for; the network and DOM waits still apply.
+        return True
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+            lambda d: any(d.find_elements(By.CSS_SELECTOR, selector) for selector in selectors)
+        )
+        return True
+    except TimeoutException:
+        logger.warning(f"None of {selectors} showed up within {timeout}s. Carrying on with what we have.")
+        return False
+
+
+def wait_for_network_idle(driver, idle_ms, timeout):
+    """
+    Waits until the document has loaded and no new network request has finished for idle_ms.
+    """
+    deadline = time.monotonic() + timeout
+    last_count = -1
+    stable_since = time.monotonic()
+    while time.monotonic() < deadline:
+        ready_state, resource_count = driver.execute_script(
+            "return [document.readyState, performance.getEntriesByType('resource').length];"
+        )
+        if resource_count != last_count:
+            # Another request finished, so restart the idle timer.
+            last_count = resource_count
+            stable_since = time.monotonic()
+        elif ready_state == 'complete' and (time.monotonic() - stable_since) * 1000 >= idle_ms:
+            return True
+        time.sleep(POLL_INTERVAL)
+    logger.debug(f"Network did not go idle within {timeout}s.")
+    return False
+
+
+def wait_for_dom_quiet(driver, quiet_ms, timeout):
+    """
+    Waits until the DOM has gone quiet_ms without any changes.
+    """
+    driver.execute_script(MUTATION_OBSERVER_SCRIPT)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        since_last_change = driver.execute_script("return performance.now() - window.__scraperLastMutation;")
+        if since_last_change >= quiet_ms:
+            return True
+        time.sleep(POLL_INTERVAL)
+    logger.debug(f"Page was still changing after {timeout}s.")
+    return False
+
+
+def wait_until_ready(driver, profile):
+    """
+    Waits for the page to be ready according to its profile and returns as soon as it is.
+    """
+    # Start watching the DOM straight away so we don't miss early changes.
+    driver.execute_script(MUTATION_OBSERVER_SCRIPT)
+    wait_for_selectors(driver, profile.selectors, profile.selector_timeout)
+    wait_for_network_idle(driver, profile.network_idle_ms, profile.network_timeout)
+    wait_for_dom_quiet(driver, profile.dom_quiet_ms, profile.dom_timeout)
+
+
+def wait_for_new_content(driver, last_height, timeout):
+    """
+    After a scroll, waits until the page grows or the timeout passes, and returns the new page height.
+    """
+    deadline = time.monotonic() + timeout
+    new_height = last_height
+    while time.monotonic() < deadline:
+        new_height = driver.execute_script("return document.body.scrollHeight")
+        if new_height != last_height:
+            break
+        time.sleep(POLL_INTERVAL)
+    return new_height
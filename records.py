@@ -0,0 +1,124 @@
+# Import necessary libraries for the typed product records the scraper produces.
+import re  # Used to pull the number out of a price label.
+from dataclasses import dataclass, field, fields  # Slotted dataclasses keep each record small.
+from typing import List, Optional  # Used to describe each field's type.
+
+# Matches the number in a price label such as '₹ 1,299.00' or 'Rs. 899'.
+PRICE_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def parse_price(value):
+    """
+    Turns a price label into a number: '₹ 1,299.00' -> 1299.0. Returns None for a missing or
+    unreadable price (None, '', 'Price Not Found').
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = PRICE_PATTERN.search(str(value))
+    if match is None:
+        return None
+    return float(match.group().replace(',', ''))
+
+
+def text_or_none(value):
+    """
+    Returns the stripped text, or None if there is none.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+@dataclass(slots=True)
+class VariantOption:
+    """
+    One color of a product: its sizes and, for each size, the price and availability.
+    The three lists line up, so price[i] and availability[i] belong to size[i].
+    """
+    color: Optional[str] = None
+    size: List[str] = field(default_factory=list)
+    price: List[Optional[float]] = field(default_factory=list)
+    availability: List[str] = field(default_factory=list)
+
+    def to_dict(self):
+        return {'color': self.color, 'size': self.size, 'price': self.price, 'availability': self.availability}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds a variant saved with to_dict(), e.g. from the freshness cache or the crawl checkpoint.
+        Prices saved as labels by older runs are parsed again.
+        """
+        return cls(color=text_or_none(data.get('color')), size=list(data.get('size') or []),
+                   price=[parse_price(price) for price in data.get('price') or []],
+                   availability=list(data.get('availability') or []))
+
+
+@dataclass(slots=True)
+class ProductDetails:
+    """
+    What a product page adds to the listing data. Every field is None (or empty) if the page
+    didn't have it.
+    """
+    material: Optional[str] = None
+    description: Optional[str] = None
+    product_category: Optional[str] = None
+    gender: Optional[str] = None
+    additional_image_link: List[str] = field(default_factory=list)
+    variant_options: List[VariantOption] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """
+    One scraped product, as written to the output. Prices are numbers and missing values are None.
+    """
+    id: str
+    title: Optional[str] = None
+    link: Optional[str] = None
+    product_category: Optional[str] = None
+    brand: Optional[str] = None
+    price: Optional[float] = None
+    gender: Optional[str] = None
+    sale_price: Optional[float] = None
+    image: Optional[str] = None
+    material: Optional[str] = None
+    description: Optional[str] = None
+    additional_image_link: List[str] = field(default_factory=list)
+    variant_options: List[VariantOption] = field(default_factory=list)
+
+    @classmethod
+    def from_listing(cls, queued, details):
+        """
+        Builds a record from a product's listing data (a list_products entry) and its ProductDetails.
+        """
+        return cls(
+            id=queued['id'],
+            title=text_or_none(queued.get('title')),
+            link=queued.get('url'),
+            product_category=details.product_category,
+            brand=text_or_none(queued.get('brand')),
+            price=parse_price(queued.get('price')),
+            gender=details.gender,
+            sale_price=parse_price(queued.get('sale_price')),
+            image=text_or_none(queued.get('image')),
+            material=details.material,
+            description=details.description,
+            additional_image_link=details.additional_image_link,
+            variant_options=details.variant_options,
+        )
+
+    def to_dict(self):
+        """
+        Returns the record as a plain dictionary (in field order), ready for JSON, CSV or Parquet.
+        """
+        record = {name: getattr(self, name) for name in RECORD_FIELDS}
+        record['variant_options'] = [variant.to_dict() for variant in self.variant_options]
+        return record
+
+
+# The output columns, in order.
+RECORD_FIELDS = tuple(record_field.name for record_field in fields(ProductRecord))
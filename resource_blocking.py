@@ -0,0 +1,69 @@
+# Import necessary libraries for stopping the browser from downloading things we never read.
+import logging  # Used for levelled progress and error messages.
+
+logger = logging.getLogger(__name__)
+
+# --- BLOCKED RESOURCES ---
+# URL patterns for each kind of resource the browser can skip. '*' matches anything.
+# A pattern has to match the whole URL, so each extension ends in '*' to also catch
+# URLs with a query string or fragment, such as 'img.jpg?w=400' ('*.woff*' covers .woff2 too).
+RESOURCE_PATTERNS = {
+    'images': ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*'],
+    'fonts': ['*.woff*', '*.ttf*', '*.otf*', '*.eot*'],
+    'media': ['*.mp4*', '*.webm*', '*.m3u8*', '*.mp3*'],
+    'trackers': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googleadservices.com*',
+        '*facebook.net*', '*connect.facebook.com*', '*hotjar.com*', '*clarity.ms*', '*criteo.com*',
+        '*bat.bing.com*', '*branch.io*', '*moengage.com*', '*webengage.com*', '*newrelic.com*', '*nr-data.net*',
+    ],
+}
+
+# Which kinds of resources are blocked on each page type.
+# Product pages keep their images: the thumbnail containers only get the 'is-loaded' class
+# (which we select on) after the image has actually loaded. Everywhere else we read image
+# URLs from attributes, so the images themselves are never needed.
+PAGE_BLOCKLISTS = {
+    'home': ['images', 'fonts', 'media', 'trackers'],
+    'listing': ['images', 'fonts', 'media', 'trackers'],
+    'product': ['fonts', 'media', 'trackers'],
+    'variant': ['images', 'fonts', 'media', 'trackers'],
+}
+
+# Blocking is on by default. Change it with configure_resource_blocking().
+BLOCK_RESOURCES = True
+
+
+def configure_resource_blocking(enabled=True, page_blocklists=None):
+    """
+    Turns resource blocking on or off and optionally replaces the per-page-type blocklists,
+    e.g. page_blocklists={'product': ['trackers']}.
+    """
+    global BLOCK_RESOURCES
+    BLOCK_RESOURCES = enabled
+    if page_blocklists:
+        PAGE_BLOCKLISTS.update(page_blocklists)
+
+
+def blocked_patterns(page_type):
+    """
+    Returns the URL patterns to block for a page type.
+    """
+    if not BLOCK_RESOURCES:
+        return []
+    patterns = []
+    for kind in PAGE_BLOCKLISTS.get(page_type, []):
+        patterns.extend(RESOURCE_PATTERNS.get(kind, []))
+    return patterns
+
+
+def apply_resource_blocking(driver, page_type):
+    """
+    Tells the browser which requests to drop for the next page load, using the Chrome DevTools protocol.
+    Browsers are shared between page types, so this is called before every page load.
+    """
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_patterns(page_type)})
+    except Exception as e:
+        # Blocking only saves bandwidth; a browser without DevTools support still loads the page normally.
+        logger.debug(f"Could not set blocked URLs for the {page_type} page: {e}")
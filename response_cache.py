@@ -0,0 +1,172 @@
+# Import necessary libraries for keeping compressed copies of fetched pages on disk.
+import logging  # Used for levelled progress and error messages.
+import gzip  # Pages are stored compressed; rendered HTML shrinks to about a tenth.
+import json  # Used to fingerprint the readiness profile of a page type.
+import os  # Used to build paths and create the cache folder.
+import sqlite3  # The index of cached pages, a small on-disk database that ships with Python.
+import threading  # Used so several workers can share one cache safely.
+import time  # Used for the TTL and for least-recently-used eviction.
+from hashlib import sha256  # Used for cache keys and to address stored pages by their content.
+from metrics import METRICS  # Records cache hits and misses for the run summary.
+from page_readiness import get_readiness_profile  # A page rendered with different waits is a different entry.
+
+logger = logging.getLogger(__name__)
+
+# How the cache is used:
+#   'record' - serve fresh entries, fetch (and store) anything missing or older than the TTL.
+#   'replay' - serve only from the cache, however old the entry is; never touch the network.
+#   'bypass' - ignore the cache completely and fetch everything live.
+CACHE_MODES = ('record', 'replay', 'bypass')
+
+
+def profile_signature(page_type, plan=None):
+    """
+    A short fingerprint of how a page type is rendered (its readiness selectors, waits and scrolling).
+    It is part of the cache key, so changing a readiness profile doesn't serve pages rendered the old way.
+    """
+    profile = vars(get_readiness_profile(page_type, plan))
+    return sha256(json.dumps(profile, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+class ResponseCache:
+    """
+    A cache of rendered HTML, keyed by URL, page type and readiness profile.
+    Pages are gzip-compressed and stored once per distinct content (content-addressed), so a page that
+    comes back unchanged under another key takes no extra space. An index in SQLite records when each
+    entry was fetched and last used. Entries older than ttl_seconds count as stale, and once the stored
+    pages pass max_bytes (compressed) the least recently used entries are evicted.
+    plan is the site profile whose readiness selectors are part of the key (the default one if None).
+    """
+
+    def __init__(self, directory='page_cache', ttl_seconds=24 * 60 * 60, max_bytes=500 * 1024 * 1024, plan=None):
+        self.directory = directory
+        self.plan = plan
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, 'pages'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, url TEXT, page_type TEXT, "
+            "content_hash TEXT, fetched_at REAL, last_used REAL)"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS contents (content_hash TEXT PRIMARY KEY, size INTEGER)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_by_use ON entries (last_used)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_by_content ON entries (content_hash)")
+        self._connection.commit()
+
+    def key(self, url, page_type):
+        return sha256(f"{page_type}\x1f{profile_signature(page_type, self.plan)}\x1f{url}".encode('utf-8')).hexdigest()
+
+    def _content_path(self, content_hash):
+        # Two-character subfolders keep any one folder from holding too many files.
+        return os.path.join(self.directory, 'pages', content_hash[:2], f"{content_hash}.html.gz")
+
+    def get(self, url, page_type, allow_stale=False):
+        """
+        Returns the cached HTML of a page, or None if there is none (or it is stale and allow_stale is False).
+        """
+        key = self.key(url, page_type)
+        with self._lock:
+            row = self._connection.execute("SELECT content_hash, fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                METRICS.increment('cache_misses', url=url)
+                return None
+            content_hash, fetched_at = row
+            if not allow_stale and time.time() - fetched_at >= self.ttl_seconds:
+                METRICS.increment('cache_stale', url=url)
+                return None
+            try:
+                with gzip.open(self._content_path(content_hash), 'rt', encoding='utf-8') as f:
+                    html_content = f.read()
+            except OSError as e:
+                # The file was deleted or damaged; forget the entry so it is fetched again.
+                logger.warning(f"Cached copy of {url} could not be read ({e}). Dropping it.")
+                self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._release_content(content_hash)
+                self._connection.commit()
+                METRICS.increment('cache_misses', url=url)
+                return None
+            self._connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+        METRICS.increment('cache_hits', url=url)
+        return html_content
+
+    def put(self, url, page_type, html_content):
+        """
+        Stores the HTML of a page, replacing any older copy, then evicts entries if the cache is too big.
+        """
+        data = html_content.encode('utf-8')
+        content_hash = sha256(data).hexdigest()
+        path = self._content_path(content_hash)
+        key = self.key(url, page_type)
+        now = time.time()
+        with self._lock:
+            previous = self._connection.execute("SELECT content_hash FROM entries WHERE key = ?", (key,)).fetchone()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write to a temporary file first, so a crash never leaves half a page behind.
+                temporary_path = f"{path}.{threading.get_ident()}.tmp"
+                with gzip.open(temporary_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temporary_path, path)
+            self._connection.execute("INSERT OR REPLACE INTO contents (content_hash, size) VALUES (?, ?)",
+                                     (content_hash, os.path.getsize(path)))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, url, page_type, content_hash, fetched_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, page_type, content_hash, now, now)
+            )
+            if previous is not None and previous[0] != content_hash:
+                self._release_content(previous[0])
+            self._evict()
+            self._connection.commit()
+
+    def _release_content(self, content_hash):
+        """
+        Deletes a stored page once no entry points to it any more.
+        """
+        if self._connection.execute("SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return
+        try:
+            os.remove(self._content_path(content_hash))
+        except OSError:
+            pass
+        self._connection.execute("DELETE FROM contents WHERE content_hash = ?", (content_hash,))
+
+    def _evict(self):
+        """
+        Drops the least recently used entries until the stored pages fit in max_bytes.
+        """
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM contents").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = self._connection.execute("SELECT key, url, content_hash FROM entries ORDER BY last_used LIMIT 1").fetchone()
+            if oldest is None:
+                break
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (oldest[0],))
+            self._release_content(oldest[2])
+            METRICS.increment('cache_evictions')
+            logger.debug(f"Evicted {oldest[1]} from the page cache.")
+            total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM contents").fetchone()[0]
+
+    def stats(self):
+        """
+        Returns the number of entries and the compressed size of the stored pages, in bytes.
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM contents").fetchone()[0]
+        return {'entries': entries, 'bytes': size}
+
+    def clear(self):
+        """
+        Removes every cached page.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM entries")
+            for (content_hash,) in self._connection.execute("SELECT content_hash FROM contents").fetchall():
+                self._release_content(content_hash)
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -1,16 +1,42 @@
 # Import necessary libraries for web scraping.
-import time  # Used for adding delays.
+import logging  # Used for levelled progress and error messages.
+import threading  # Used to create the shared driver pool only once.
+import time  # Used to time the scrolling stage.
+from functools import lru_cache  # Used to download the ChromeDriver only once per run.
 from selenium import webdriver  # The core library for browser automation.
 from selenium.webdriver.chrome.service import Service as ChromeService # Manages the ChromeDriver service.
 from selenium.webdriver.chrome.options import Options # Allows setting custom Chrome options.
 from webdriver_manager.chrome import ChromeDriverManager # Automatically manages the Chrome driver.
+from driver_pool import DriverPool # Lends out reusable browser sessions.
+from artifacts import dump_artifact # Saves optional per-URL debug copies of pages.
+from metrics import METRICS # Records stage timings and counts for the run summary.
+from resource_blocking import apply_resource_blocking # Skips images, fonts and trackers we never read.
+from page_readiness import get_readiness_profile, wait_until_ready, wait_for_new_content, wait_for_dom_quiet # Event-driven page waits.
+
+logger = logging.getLogger(__name__)
+
+# Default settings for the shared browser pool. Change them with configure_driver_pool().
+DRIVER_POOL_SIZE = 2
+MAX_PAGES_PER_DRIVER = 50
+# How many pages one browser loads at the same time in scrape_urls_in_tabs().
+MAX_TABS_PER_DRIVER = 4
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def get_chromedriver_path():
+    """
+    Downloads (or finds the cached) ChromeDriver once and remembers its path.
+    """
+    return ChromeDriverManager().install()
 
 def setup_driver():
     """
     This function gets our automated Chrome browser ready to go.
     We'll set it up with special options to make it look less like a bot.
     """
-    print("Setting up the automated browser (WebDriver)...")
+    logger.info("Setting up the automated browser (WebDriver)...")
     
     # Initialize Chrome options for customization.
     options = Options() 
@@ -33,89 +59,278 @@ def setup_driver():
     options.add_experimental_option('useAutomationExtension', False)
     
     # Automatically download and install the correct ChromeDriver.
-    service = ChromeService(ChromeDriverManager().install())
+    service = ChromeService(get_chromedriver_path())
     
     # Initialize the Chrome driver with the service and options.
-    driver = webdriver.Chrome(service=service, options=options)
+    with METRICS.timer('driver_startup'):
+        driver = webdriver.Chrome(service=service, options=options)
+    METRICS.increment('driver_launches')
     
     # Execute script to remove the 'navigator.webdriver' property to avoid detection.
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     
-    print("Browser setup is complete!")
+    logger.info("Browser setup is complete!")
     return driver
 
-def scrape_specific_url(scraping_url, output_filename, scroll_pause_time=2.5, max_no_change_scrolls=3):
+def configure_driver_pool(size=DRIVER_POOL_SIZE, max_pages_per_driver=MAX_PAGES_PER_DRIVER):
+    """
+    Replaces the shared browser pool with one of the given size and recycling limit.
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is not None:
+            _driver_pool.close()
+        _driver_pool = DriverPool(setup_driver, size=size, max_pages_per_driver=max_pages_per_driver)
+    return _driver_pool
+
+def get_driver_pool():
+    """
+    Returns the shared browser pool, creating it with the default settings on first use.
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool(setup_driver, size=DRIVER_POOL_SIZE, max_pages_per_driver=MAX_PAGES_PER_DRIVER)
+        return _driver_pool
+
+def close_driver_pool():
     """
-    This function takes a URL, scrolls all the way to the bottom to load everything,
-    and then saves the final HTML of the page to a file.
+    Closes every browser in the shared pool. Call this once at the end of a crawl.
     """
-    # Initialize the configured WebDriver.
-    driver = setup_driver()
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is not None:
+            _driver_pool.close()
+            _driver_pool = None
+
+def _scroll_steps(driver, scraping_url, profile, scroll_pause_time, max_no_change_scrolls):
+    """
+    Scrolls an infinite-scroll page to the bottom, one step at a time. This is a generator that
+    yields after every scroll, so the caller can read the content that just loaded before scrolling on.
+    """
+    # Get the initial scroll height of the page.
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    logger.debug("Starting to scroll down the page to find all the content.")
+    # Counter for consecutive scrolls with no height change.
+    consecutive_scrolls_without_change = 0
+
+    # Loop until the page stops loading new content.
+    scroll_started = time.perf_counter()
+    while consecutive_scrolls_without_change < max_no_change_scrolls:
+        # Scroll to the bottom of the page.
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        METRICS.increment('scroll_iterations', url=scraping_url)
+    
+        # Wait for new content to load after scrolling, returning as soon as the page grows.
+        new_height = wait_for_new_content(driver, last_height, scroll_pause_time)
     
-    # Use a try...finally block to ensure the driver quits properly.
+        # A failsafe to stop scrolling on extremely long pages. Can be removed.
+        if new_height >= 100000:
+            last_height = new_height
+            logger.info(f"Page is getting very long! Stopping scroll at {new_height}px.")
+            break
+
+        # Check if the scroll height has changed.
+        if new_height == last_height:
+            # If height is unchanged, increment the no-change counter.
+            consecutive_scrolls_without_change += 1
+            logger.debug(f"Page height hasn't changed. Checking again... ({consecutive_scrolls_without_change}/{max_no_change_scrolls})")
+        else:
+            # If height changed, new content loaded; reset the counter.
+            consecutive_scrolls_without_change = 0
+            logger.debug(f"Scrolled down. New page height is now: {new_height}px")
+    
+        # Update the last known height.
+        last_height = new_height
+        yield new_height
+
+    # Let the last batch of products finish rendering.
+    wait_for_dom_quiet(driver, profile.dom_quiet_ms, profile.dom_timeout)
+    METRICS.observe('scroll', (time.perf_counter() - scroll_started) * 1000, url=scraping_url)
+    logger.info(f"Looks like we've reached the bottom! The final page height is {last_height}px.")
+    yield last_height
+
+def scrape_specific_url(scraping_url, output_filename=None, scroll_pause_time=None, max_no_change_scrolls=None, pool=None, page_type='listing', plan=None):
+    """
+    This function takes a URL, waits until the page is ready, scrolls to the bottom if the
+    page type loads content as you scroll, and then returns the final HTML of the page.
+    The HTML is only written to output_filename if one is given (or to a per-URL debug copy
+    when artifact dumping is enabled). Returns None if the page could not be scraped.
+    The browser is borrowed from a pool and handed back afterwards instead of being quit.
+    page_type picks the readiness profile ('home', 'listing', 'product' or 'variant'), and plan the
+    site profile its selectors come from (the default one if None).
+    """
+    # The HTML we hand back to the caller; stays None if anything goes wrong.
+    final_html = None
+    # Use the shared pool unless the caller brought their own.
+    pool = pool or get_driver_pool()
+    # Look up what "ready" means for this kind of page.
+    profile = get_readiness_profile(page_type, plan)
+    # The longest we wait for new content after each scroll.
+    scroll_pause_time = profile.scroll_timeout if scroll_pause_time is None else scroll_pause_time
+    max_no_change_scrolls = profile.max_no_change_scrolls if max_no_change_scrolls is None else max_no_change_scrolls
+    
+    # Use a try...except block so a failed page doesn't stop the crawl.
     try:
-        print(f"Let's go to: {scraping_url}...")
-        
-        # Navigate to the target URL.
-        driver.get(scraping_url) 
+        with pool.borrow() as driver:
+            logger.info(f"Let's go to: {scraping_url}...")
+            # Drop the requests this page type doesn't need (images, fonts, trackers...).
+            apply_resource_blocking(driver, page_type)
         
-        # Wait for the initial page content to load.
-        print("Giving the page a moment to load...")
-        time.sleep(5)
-
-        print("Starting to scroll down the page to find all the content.")
+            with METRICS.timer('page_load', url=scraping_url):
+                # Navigate to the target URL.
+                driver.get(scraping_url) 
         
-        # Get the initial scroll height of the page.
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        # Counter for consecutive scrolls with no height change.
-        consecutive_scrolls_without_change = 0
-
-        # Loop until the page stops loading new content.
-        while consecutive_scrolls_without_change < max_no_change_scrolls:
-            # Scroll to the bottom of the page.
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            
-            # Wait for new content to load after scrolling.
-            time.sleep(scroll_pause_time)
-            
-            # Calculate the new scroll height.
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            
-            # A failsafe to stop scrolling on extremely long pages. Can be removed.
-            if new_height >= 100000:
-                last_height = new_height
-                print(f"Page is getting very long! Stopping scroll at {new_height}px.")
-                break
-
-            # Check if the scroll height has changed.
-            if new_height == last_height:
-                # If height is unchanged, increment the no-change counter.
-                consecutive_scrolls_without_change += 1
-                print(f"Page height hasn't changed. Checking again... ({consecutive_scrolls_without_change}/{max_no_change_scrolls})")
-            else:
-                # If height changed, new content loaded; reset the counter.
-                consecutive_scrolls_without_change = 0
-                print(f"Scrolled down. New page height is now: {new_height}px")
-            
-            # Update the last known height.
-            last_height = new_height
+                # Wait until the content we need has loaded, rather than sleeping a fixed time.
+                logger.debug(f"Waiting for the {page_type} page to be ready...")
+                wait_until_ready(driver, profile)
 
-        print(f"\nLooks like we've reached the bottom! The final page height is {last_height}px.")
+            if profile.scroll:
+                # Scroll until the page stops loading new content.
+                for _ in _scroll_steps(driver, scraping_url, profile, scroll_pause_time, max_no_change_scrolls):
+                    pass
         
-        # Get the final page source after all content has loaded.
-        final_html = driver.page_source
+            # Get the final page source after all content has loaded.
+            final_html = driver.page_source
+        METRICS.increment('pages_loaded', url=scraping_url)
+        METRICS.increment('html_bytes', len(final_html), url=scraping_url)
         
-        # Save the complete HTML to the specified output file.
-        with open(output_filename, "w", encoding="utf-8") as f:
-            f.write(final_html)
-            
-        print(f"Success! The full webpage content has been saved to '{output_filename}'")
+        # Save the complete HTML to the specified output file, if the caller asked for one.
+        if output_filename:
+            with open(output_filename, "w", encoding="utf-8") as f:
+                f.write(final_html)
+            logger.info(f"Success! The full webpage content has been saved to '{output_filename}'")
+        else:
+            logger.info(f"Success! Got {len(final_html)} characters of HTML from {scraping_url}")
+        # Keep a per-URL debug copy when artifact dumping is switched on.
+        dump_artifact(scraping_url, 'raw', html=final_html)
+
+    except Exception as e:
+        # Handle and report any exceptions during the process.
+        logger.error(f"Oh no, something went wrong with {scraping_url}: {e}")
+        METRICS.increment('page_errors', url=scraping_url)
+
+    return final_html
+
+# JavaScript that returns the outer HTML of up to arguments[1] product cards not read yet, and marks them as read.
+COLLECT_NEW_NODES_SCRIPT = """
+var found = [];
+var nodes = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < nodes.length && found.length < arguments[1]; i++) {
+    if (nodes[i].hasAttribute('data-scraper-read')) { continue; }
+    nodes[i].setAttribute('data-scraper-read', '1');
+    found.push(nodes[i].outerHTML);
+}
+return found;
+"""
+
+def _collect_new_nodes(driver, selector, batch_size):
+    """
+    Reads every product card that appeared since the last call, batch_size cards at a time.
+    """
+    while True:
+        batch = driver.execute_script(COLLECT_NEW_NODES_SCRIPT, selector, batch_size)
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+
+def stream_listing(scraping_url, selector, batch_size=50, scroll_pause_time=None, max_no_change_scrolls=None, pool=None, page_type='listing', plan=None):
+    """
+    Loads an infinite-scroll listing page and yields its product cards while it scrolls, as lists of
+    up to batch_size HTML snippets (one per node matching the CSS selector). Cards are read from the
+    browser as they load, so the full page HTML is never built and memory depends on batch_size,
+    not on the size of the category. Each card is yielded once.
+    The browser stays borrowed until the generator finishes or is closed. If the page fails to
+    load nothing is yielded; if it fails later, the cards already yielded are kept.
+    """
+    pool = pool or get_driver_pool()
+    profile = get_readiness_profile(page_type, plan)
+    scroll_pause_time = profile.scroll_timeout if scroll_pause_time is None else scroll_pause_time
+    max_no_change_scrolls = profile.max_no_change_scrolls if max_no_change_scrolls is None else max_no_change_scrolls
+    cards = 0
+    try:
+        with pool.borrow() as driver:
+            logger.info(f"Let's go to: {scraping_url} (streaming its product cards)...")
+            apply_resource_blocking(driver, page_type)
+            with METRICS.timer('page_load', url=scraping_url):
+                driver.get(scraping_url)
+                wait_until_ready(driver, profile)
+            METRICS.increment('pages_loaded', url=scraping_url)
 
+            # Read the cards that are already there, then the new ones after every scroll.
+            for batch in _collect_new_nodes(driver, selector, batch_size):
+                cards += len(batch)
+                METRICS.increment('streamed_cards', len(batch), url=scraping_url)
+                yield batch
+            for _ in _scroll_steps(driver, scraping_url, profile, scroll_pause_time, max_no_change_scrolls):
+                for batch in _collect_new_nodes(driver, selector, batch_size):
+                    cards += len(batch)
+                    METRICS.increment('streamed_cards', len(batch), url=scraping_url)
+                    yield batch
+        logger.info(f"Success! Streamed {cards} product cards from {scraping_url}")
     except Exception as e:
         # Handle and report any exceptions during the process.
-        print(f"Oh no, something went wrong: {e}")
-    finally:
-        # This block ensures the browser is closed, even if errors occurred.
-        print("Closing the browser session now. Bye!")
-        driver.quit()
+        logger.error(f"Oh no, something went wrong with {scraping_url} after {cards} product cards: {e}")
+        METRICS.increment('page_errors', url=scraping_url)
 
+def _close_extra_tabs(driver, main_tab):
+    """
+    Closes every tab except main_tab and switches back to it, so the browser goes back to the pool clean.
+    """
+    for handle in driver.window_handles:
+        if handle != main_tab:
+            driver.switch_to.window(handle)
+            driver.close()
+    driver.switch_to.window(main_tab)
+
+def scrape_urls_in_tabs(urls, pool=None, page_type='variant', max_tabs=None, plan=None):
+    """
+    Loads several pages at the same time in tabs of one pooled browser and returns their HTML,
+    in the same order as urls (None for a page that failed).
+    All tabs start loading at once, then each is waited on and read in turn. Meant for pages
+    that don't need scrolling, such as colour variants.
+    """
+    results = [None] * len(urls)
+    pool = pool or get_driver_pool()
+    profile = get_readiness_profile(page_type, plan)
+    max_tabs = max_tabs or MAX_TABS_PER_DRIVER
+    for start in range(0, len(urls), max_tabs):
+        batch = list(enumerate(urls))[start:start + max_tabs]
+        try:
+            with pool.borrow(pages=len(batch)) as driver:
+                main_tab = driver.current_window_handle
+                try:
+                    tabs = []
+                    for index, url in batch:
+                        logger.info(f"Opening a tab for: {url}...")
+                        driver.switch_to.new_window('tab')
+                        # Blocking is set per tab, so it has to be applied before the tab starts loading.
+                        apply_resource_blocking(driver, page_type)
+                        # Start the load without waiting for it, so every tab loads at the same time.
+                        driver.execute_script("window.location.href = arguments[0];", url)
+                        tabs.append((index, url, driver.current_window_handle, time.perf_counter()))
+                    for index, url, handle, started in tabs:
+                        driver.switch_to.window(handle)
+                        try:
+                            wait_until_ready(driver, profile)
+                            html_content = driver.page_source
+                        except Exception as e:
+                            logger.error(f"Oh no, something went wrong with {url}: {e}")
+                            METRICS.increment('page_errors', url=url)
+                            continue
+                        METRICS.observe('page_load', (time.perf_counter() - started) * 1000, url=url)
+                        METRICS.increment('pages_loaded', url=url)
+                        METRICS.increment('html_bytes', len(html_content), url=url)
+                        logger.info(f"Success! Got {len(html_content)} characters of HTML from {url}")
+                        # Keep a per-URL debug copy when artifact dumping is switched on.
+                        dump_artifact(url, 'raw', html=html_content)
+                        results[index] = html_content
+                finally:
+                    _close_extra_tabs(driver, main_tab)
+        except Exception as e:
+            # A browser that fails here fails the whole batch; the caller can retry those pages.
+            logger.error(f"Oh no, the browser failed while loading {len(batch)} tabs: {e}")
+            METRICS.increment('page_errors', len(batch))
+    return results
@@ -0,0 +1,63 @@
+# Import necessary libraries for remembering which products were already scraped.
+import logging  # Used for levelled progress and error messages.
+import sqlite3  # A small on-disk database that ships with Python.
+import threading  # Used so several workers can share one index safely.
+
+logger = logging.getLogger(__name__)
+
+
+class SeenIndex:
+    """
+    A set of product ids (the sha256 'id' field) that have already been scraped.
+    Lookups hit an in-memory set, so checking a product is O(1). Every id is also saved to
+    a SQLite file, so products scraped in earlier runs are skipped as well.
+    Pass path=None to keep the index in memory for a single run only.
+    """
+
+    def __init__(self, path='seen_products.db', commit_every=100):
+        self.path = path
+        # Ids are committed to disk in batches to keep the write cost low.
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        # check_same_thread=False lets worker threads share the connection; the lock serialises access.
+        self._connection = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)")
+        self._connection.commit()
+        # Load every id we've seen before into memory once, up front.
+        self._ids = {row[0] for row in self._connection.execute("SELECT id FROM seen")}
+        if self._ids:
+            logger.info(f"Loaded {len(self._ids)} already-scraped products from '{path}'.")
+
+    def __contains__(self, product_id):
+        return product_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, product_id):
+        """
+        Marks a product as scraped. Returns True if it was new, False if it was already known.
+        """
+        with self._lock:
+            if product_id in self._ids:
+                return False
+            self._ids.add(product_id)
+            self._connection.execute("INSERT OR IGNORE INTO seen (id) VALUES (?)", (product_id,))
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._connection.commit()
+                self._pending = 0
+            return True
+
+    def flush(self):
+        """
+        Saves any ids that haven't been committed to disk yet.
+        """
+        with self._lock:
+            self._connection.commit()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._connection.close()
@@ -0,0 +1,185 @@
+# Import necessary libraries for loading a site profile and compiling it into an extraction plan.
+import logging  # Used for levelled progress and error messages.
+import json  # Site profiles are JSON files.
+import os  # Used to find the bundled site profiles folder.
+from functools import lru_cache  # Used so each profile is loaded and compiled only once.
+from bs4 import SoupStrainer  # Used to parse only the regions the profile describes.
+from bs4.element import Tag  # Used to skip text nodes during the single pass.
+from html_parser import any_class_pattern, PAGE_REGIONS  # Class matching, and the product/variant parse regions.
+
+logger = logging.getLogger(__name__)
+
+# The site profile used when none is given.
+DEFAULT_SITE_PROFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'site_profiles', 'nnnow.json')
+
+
+class ElementMatcher:
+    """
+    A precompiled test for one kind of element: its tag name, its classes and any extra attributes.
+    With class_match 'any' (the default) one of the classes is enough; with 'all' every class must be present.
+    """
+
+    def __init__(self, tag=None, classes=None, attrs=None, class_match='any'):
+        self.tag = tag
+        self.classes = frozenset(classes or [])
+        self.attrs = dict(attrs or {})
+        self.match_all_classes = class_match == 'all'
+
+    def matches(self, element):
+        if self.tag is not None and element.name != self.tag:
+            return False
+        if self.classes:
+            element_classes = element.get('class') or []
+            if self.match_all_classes:
+                if not self.classes.issubset(element_classes):
+                    return False
+            elif self.classes.isdisjoint(element_classes):
+                return False
+        for name, value in self.attrs.items():
+            if element.get(name) != value:
+                return False
+        return True
+
+    def strainer(self):
+        """
+        Builds a SoupStrainer so the parser only keeps elements this matcher can match.
+        """
+        if self.attrs:
+            return SoupStrainer(self.tag, attrs=self.attrs)
+        if self.classes:
+            return SoupStrainer(self.tag, class_=any_class_pattern(*sorted(self.classes)))
+        return SoupStrainer(self.tag)
+
+    def css_selector(self):
+        """
+        Builds the CSS selector for the same elements, for use in the browser (document.querySelectorAll).
+        """
+        attrs = "".join(f'[{name}="{value}"]' for name, value in self.attrs.items())
+        tag = self.tag or ''
+        if not self.classes:
+            return (tag + attrs) or '*'
+        if self.match_all_classes:
+            return tag + "".join(f".{name}" for name in sorted(self.classes)) + attrs
+        # With 'any', one selector per class, joined with commas.
+        return ", ".join(f"{tag}.{name}{attrs}" for name in sorted(self.classes))
+
+
+def _compile_matcher(spec):
+    return ElementMatcher(tag=spec.get('tag'), classes=spec.get('class'), attrs=spec.get('attrs'),
+                          class_match=spec.get('class_match', 'any'))
+
+
+class ExtractionPlan:
+    """
+    A site profile compiled into matchers. Every listing field is pulled out in one walk
+    over the listing node, instead of one find() per field.
+    """
+
+    def __init__(self, profile):
+        self.name = profile['name']
+        self.base_url = profile['base_url']
+        self.navigation_link = _compile_matcher(profile['navigation_link'])
+        self.listing = _compile_matcher(profile['listing'])
+        # (field name, matcher, default value) in the order the profile lists them.
+        # A field without a default is None when the listing doesn't have it.
+        self.fields = [(name, _compile_matcher(spec), spec.get('default'))
+                       for name, spec in profile['fields'].items()]
+        # CSS selectors that show a page of each type has rendered what we need (any one of them is enough).
+        # Without them, the homepage waits for a category link and category pages for a product card.
+        self.readiness_selectors = {page_type: list(selectors) for page_type, selectors in (profile.get('readiness') or {}).items()}
+        self.readiness_selectors.setdefault('home', [self.navigation_link.css_selector()])
+        self.readiness_selectors.setdefault('listing', [self.listing_selector()])
+
+    def navigation_regions(self):
+        """
+        The parts of the homepage to parse: just the category links.
+        """
+        return self.navigation_link.strainer()
+
+    def listing_regions(self):
+        """
+        The parts of a category page to parse: just the listing nodes and what is inside them.
+        """
+        return self.listing.strainer()
+
+    def listing_selector(self):
+        """
+        The CSS selector of the listing nodes, used to read product cards straight from the browser.
+        """
+        return self.listing.css_selector()
+
+    def page_regions(self, page_type):
+        """
+        The parts of a page of the given type to parse: the profile's regions for the homepage and
+        category pages, the parser's own regions for product and colour pages.
+        """
+        if page_type == 'home':
+            return self.navigation_regions()
+        if page_type == 'listing':
+            return self.listing_regions()
+        return PAGE_REGIONS.get(page_type)
+
+    def ready_selectors(self, page_type):
+        """
+        The CSS selectors a page of the given type must show before it is read (any one is enough).
+        Unknown page types use the category page selectors. A plain-HTTP page is checked within its
+        parse regions (page_regions), so the selectors must point inside them.
+        """
+        return self.readiness_selectors.get(page_type, self.readiness_selectors['listing'])
+
+    def find_navigation_links(self, soup):
+        """
+        Returns the category links on the homepage.
+        """
+        return soup.find_all(self.navigation_link.matches)
+
+    def find_listings(self, soup):
+        """
+        Returns every product listing node on a category page.
+        """
+        return soup.find_all(self.listing.matches)
+
+    def extract(self, listing_node):
+        """
+        Pulls every field out of one listing node in a single pass over its descendants.
+        Like find(), the first matching element in document order wins.
+        """
+        values = {}
+        remaining = list(self.fields)
+        for element in listing_node.descendants:
+            if not isinstance(element, Tag):
+                continue
+            # Check the element against every field still missing; one element may fill several fields.
+            for field in list(remaining):
+                name, matcher, _ = field
+                if matcher.matches(element):
+                    values[name] = element.get_text(strip=True)
+                    remaining.remove(field)
+            if not remaining:
+                break
+        # Fill in the default for anything the listing didn't have.
+        for name, _, default in remaining:
+            values[name] = default
+        return values
+
+
+def _read_profile(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("YAML site profiles need the 'PyYAML' package. Install it with: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_site_profile(path=DEFAULT_SITE_PROFILE):
+    """
+    Loads a site profile (JSON, or YAML if PyYAML is installed) and compiles it into an ExtractionPlan.
+    Each file is only read and compiled once per run.
+    """
+    plan = ExtractionPlan(_read_profile(path))
+    logger.info(f"Loaded site profile '{plan.name}' from '{path}'.")
+    return plan
@@ -0,0 +1,151 @@
+# Import necessary libraries for reading the structured product data that pages embed for search engines.
+import logging  # Used for levelled progress and error messages.
+import json  # Used to parse the embedded JSON.
+import re  # Used to find the JSON blocks without parsing the whole page.
+from urllib.parse import urljoin  # Used to compare variant URLs with the page URL.
+from records import VariantOption, parse_price, text_or_none  # The typed variant the DOM path returns too.
+
+logger = logging.getLogger(__name__)
+
+# Matches every <script type="application/ld+json"> block. One pass over the raw HTML, no DOM needed.
+JSON_LD_PATTERN = re.compile(
+    r'<script[^>]*type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+
+# The product detail fields the structured data can fill in.
+DETAIL_FIELDS = ['material', 'description', 'additional_image_link', 'product_category', 'gender']
+
+
+def json_ld_items(html_content):
+    """
+    Returns every JSON-LD object on the page, with @graph containers and top-level lists flattened.
+    Blocks that aren't valid JSON are skipped.
+    """
+    items = []
+    for block in JSON_LD_PATTERN.findall(html_content or ''):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            logger.debug("Skipping a JSON-LD block that isn't valid JSON.")
+            continue
+        pending = data if isinstance(data, list) else [data]
+        for item in pending:
+            if isinstance(item, dict):
+                items.append(item)
+                if isinstance(item.get('@graph'), list):
+                    items.extend(node for node in item['@graph'] if isinstance(node, dict))
+    return items
+
+
+def _has_type(item, *types):
+    item_type = item.get('@type')
+    item_types = item_type if isinstance(item_type, list) else [item_type]
+    return any(t in item_types for t in types)
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _text(value):
+    """
+    Turns a schema.org value (a string, a number or a {'name': ...} object) into plain text.
+    """
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('value')
+    return str(value).strip() if value is not None else ''
+
+
+def variant_from_offers(color, offers):
+    """
+    Builds a VariantOption (color, sizes, prices, availability) from schema.org offers, like the
+    DOM path. Returns None if any offer is missing its size label or price.
+    """
+    variant = VariantOption(color=text_or_none(color))
+    for offer in offers:
+        if not isinstance(offer, dict):
+            return None
+        item = offer.get('itemOffered') if isinstance(offer.get('itemOffered'), dict) else {}
+        size = _text(offer.get('size') or item.get('size'))
+        price = parse_price(_text(offer.get('price')))
+        if not size or price is None:
+            return None
+        variant.size.append(size)
+        variant.price.append(price)
+        # 'https://schema.org/InStock' -> 'InStock', matching the itemprop spans.
+        variant.availability.append(_text(offer.get('availability')).rsplit('/', 1)[-1])
+    return variant if variant.size else None
+
+
+def _group_variants(group, page_url):
+    """
+    Reads the variants of a schema.org ProductGroup, one per color, the page's own color first.
+    """
+    by_color = {}
+    selected_color = _text(group.get('color'))
+    for product in _as_list(group.get('hasVariant')):
+        if not isinstance(product, dict):
+            continue
+        color = _text(product.get('color'))
+        offers = _as_list(product.get('offers'))
+        if product.get('size') is not None:
+            # Variants split by size carry the size on the product rather than on the offer.
+            offers = [dict(offer, size=product['size']) for offer in offers if isinstance(offer, dict)]
+        by_color.setdefault(color, []).extend(offers)
+        if product.get('url') and urljoin(page_url, product['url']) == page_url:
+            selected_color = color
+    variants = []
+    for color, offers in by_color.items():
+        variant = variant_from_offers(color, offers)
+        if variant is None:
+            # One unreadable color means we can't trust the rest; let the DOM path handle the page.
+            return []
+        variants.append(variant)
+    variants.sort(key=lambda variant: variant.color != text_or_none(selected_color))
+    return variants
+
+
+def read_structured_product(html_content, page_url):
+    """
+    Reads a product (or colour) page's JSON-LD. Returns None if the page has no Product data,
+    otherwise a dictionary with:
+      - whichever of DETAIL_FIELDS the data has,
+      - 'variants': the variants it describes, the page's own color first (empty if none could be read),
+      - 'all_colors': True if those variants cover every color (a ProductGroup), so no color page needs loading.
+    """
+    items = json_ld_items(html_content)
+    product = next((item for item in items if _has_type(item, 'ProductGroup')), None) \
+        or next((item for item in items if _has_type(item, 'Product')), None)
+    if product is None:
+        return None
+
+    structured = {}
+    if product.get('material'):
+        structured['material'] = _text(product['material'])
+    if product.get('description'):
+        structured['description'] = _text(product['description'])
+    images = [_text(image) if not isinstance(image, dict) else _text(image.get('url')) for image in _as_list(product.get('image'))]
+    if images:
+        structured['additional_image_link'] = [image for image in images if image]
+
+    # The breadcrumb trail gives the category and, third from the top, the gender (as in the DOM path).
+    breadcrumbs = next((item for item in items if _has_type(item, 'BreadcrumbList')), None)
+    if breadcrumbs is not None:
+        crumbs = sorted(_as_list(breadcrumbs.get('itemListElement')), key=lambda crumb: crumb.get('position', 0) if isinstance(crumb, dict) else 0)
+        names = [_text(crumb.get('name') or crumb.get('item')) for crumb in crumbs if isinstance(crumb, dict)]
+        names = [name for name in names if name]
+        if names:
+            structured['product_category'] = "".join(name + " > " for name in names)
+            structured['gender'] = text_or_none(names[2]) if len(names) > 2 else None
+
+    if _has_type(product, 'ProductGroup'):
+        structured['variants'] = _group_variants(product, page_url)
+        structured['all_colors'] = bool(structured['variants'])
+    else:
+        variant = variant_from_offers(_text(product.get('color')), _as_list(product.get('offers')))
+        structured['variants'] = [variant] if variant else []
+        structured['all_colors'] = False
+    return structured
@@ -0,0 +1,82 @@
+# The scraper's modules live in the project folder, one level up from the tests.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import Fetcher  # noqa: E402
+from output_sink import OutputSink  # noqa: E402
+
+# --- SHARED PAGES ---
+# Small nnnow-style pages the tests serve from memory instead of the network.
+HOME = 'https://www.nnnow.com'
+
+# A product (or colour) page with one colour, one size and its price.
+PRODUCT_PAGE = """<html><body><div class="nw-product-detail">
+<span class="nw-color-name">Blue</span>
+<button class="nwc-btn nw-size-chip">M</button>
+<span class="nwc-hide" itemprop="price">999</span>
+<span class="nwc-hide" itemprop="availability">InStock</span>
+</div></body></html>"""
+
+
+def product_url(name):
+    return f"{HOME}/{name}"
+
+
+def home_page(*category_urls):
+    """
+    A homepage linking to the given category pages.
+    """
+    links = "".join(f'<a class="nw-navtreev2-link nw-navtreev2-link-level2" href="{url}">Category</a>' for url in category_urls)
+    return f"<html><body>{links}</body></html>"
+
+
+def listing_page(*names):
+    """
+    A category page with one product card per product name.
+    """
+    cards = "".join(f"""
+<div class="nwc-grid-col nwc-grid-col-xs-6 nwc-grid-col-sm-4 nw-productlist-eachproduct" itemprop="itemListElement">
+  <div class="nw-productview-producttitle">{name}</div>
+  <div class="nwc-hide" itemprop="url">www.nnnow.com/{name}</div>
+  <h3 class="nw-productview-brandtxt">Brand</h3>
+  <span class="nw-priceblock-amt nw-priceblock-sellingprice is-having-discount">999</span>
+</div>""" for name in names)
+    return f"<html><body>{cards}</body></html>"
+
+
+def queued_product(name):
+    """
+    The listing data list_products queues for a product, as scrape_products and the work queue expect it.
+    """
+    return {'id': name, 'complete_url': product_url(name), 'url': f"www.nnnow.com/{name}", 'title': name,
+            'brand': 'Brand', 'price': None, 'sale_price': 999.0, 'image': None, 'fingerprint': name,
+            'refresh_variants': False}
+
+
+class PageFetcher(Fetcher):
+    """
+    Serves fixed pages by URL (None for any other URL) and records every fetch as (url, page_type).
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def fetch(self, url, page_type):
+        self.fetched.append((url, page_type))
+        return self.pages.get(url)
+
+
+class ListSink(OutputSink):
+    """
+    Keeps the written records in a list.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
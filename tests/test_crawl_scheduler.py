@@ -0,0 +1,114 @@
+# Tests for the crawl scheduler: frontier priorities, retries with backoff, and the per-host rate limiter.
+import asyncio
+import threading
+
+from conftest import PageFetcher
+from crawl_scheduler import CrawlScheduler, TokenBucket
+
+
+class FlakyFetcher(PageFetcher):
+    """
+    Fails (returns None, or raises) a set number of times for each URL before serving its page.
+    """
+
+    def __init__(self, pages, failures, raise_errors=False):
+        super().__init__(pages)
+        self.failures = dict(failures)
+        self.raise_errors = raise_errors
+
+    def fetch(self, url, page_type):
+        self.fetched.append((url, page_type))
+        if self.failures.get(url, 0) > 0:
+            self.failures[url] -= 1
+            if self.raise_errors:
+                raise ConnectionError("connection reset")
+            return None
+        return self.pages.get(url)
+
+
+class GatedFetcher(PageFetcher):
+    """
+    Holds the first fetch until the test opens the gate, so more pages can pile up in the frontier.
+    """
+
+    def __init__(self, pages):
+        super().__init__(pages)
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def fetch(self, url, page_type):
+        if not self.started.is_set():
+            self.started.set()
+            self.gate.wait(timeout=5)
+        return super().fetch(url, page_type)
+
+
+def test_the_frontier_fetches_variants_then_products_then_listings():
+    pages = {f"https://www.nnnow.com/{name}": name for name in ('home', 'listing', 'product', 'variant')}
+    fetcher = GatedFetcher(pages)
+
+    async def crawl():
+        async with CrawlScheduler(fetcher, max_concurrency=1, requests_per_second=None) as scheduler:
+            first = asyncio.create_task(scheduler.fetch('https://www.nnnow.com/home', 'home'))
+            await asyncio.to_thread(fetcher.started.wait, 5)
+            # The only worker is busy, so these wait in the frontier in the "wrong" order.
+            later = [asyncio.create_task(scheduler.fetch(f"https://www.nnnow.com/{page_type}", page_type))
+                     for page_type in ('listing', 'product', 'variant')]
+            await asyncio.sleep(0.05)
+            fetcher.gate.set()
+            return await asyncio.gather(first, *later)
+
+    results = asyncio.run(crawl())
+
+    assert results == ['home', 'listing', 'product', 'variant']
+    assert [page_type for _, page_type in fetcher.fetched] == ['home', 'variant', 'product', 'listing']
+
+
+def test_a_failed_page_is_retried_until_it_loads():
+    url = 'https://www.nnnow.com/product-a'
+    fetcher = FlakyFetcher({url: 'page'}, {url: 2}, raise_errors=True)
+
+    async def crawl():
+        async with CrawlScheduler(fetcher, requests_per_second=None, max_retries=3, backoff_base=0.01) as scheduler:
+            return await scheduler.fetch(url, 'product')
+
+    assert asyncio.run(crawl()) == 'page'
+    assert len(fetcher.fetched) == 3
+
+
+def test_a_page_is_given_up_on_after_max_retries():
+    url = 'https://www.nnnow.com/product-a'
+    fetcher = FlakyFetcher({url: 'page'}, {url: 5})
+
+    async def crawl():
+        async with CrawlScheduler(fetcher, requests_per_second=None, max_retries=1, backoff_base=0.01) as scheduler:
+            return await scheduler.fetch(url, 'product')
+
+    assert asyncio.run(crawl()) is None
+    assert len(fetcher.fetched) == 2
+
+
+def test_the_backoff_grows_exponentially_up_to_the_cap():
+    scheduler = CrawlScheduler(PageFetcher({}), backoff_base=1.0, max_backoff=5.0)
+    # Each delay has up to backoff_base of jitter on top.
+    assert 1.0 <= scheduler._backoff_delay(0) <= 2.0
+    assert 4.0 <= scheduler._backoff_delay(2) <= 5.0
+    assert 5.0 <= scheduler._backoff_delay(10) <= 6.0
+
+
+def test_the_token_bucket_allows_a_burst_then_spaces_requests():
+    async def take(bucket, count):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        times = []
+        for _ in range(count):
+            await bucket.acquire()
+            times.append(loop.time() - start)
+        return times
+
+    times = asyncio.run(take(TokenBucket(rate=20, burst=2), 4))
+
+    # The first two go straight through, then one every 1/20 s.
+    assert times[1] < 0.02
+    assert times[2] >= 0.04
+    assert times[3] >= 0.09
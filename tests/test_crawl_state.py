@@ -0,0 +1,36 @@
+# Tests for the crawl checkpoint, in particular pages that share a URL across page types.
+from conftest import product_url, queued_product
+from crawl_state import CrawlState, DONE, FAILED, PENDING
+from detailed_product_information import cached_variant
+from records import VariantOption
+
+PRODUCT_B = product_url('product-b')
+LISTING_DATA = queued_product('product-b')
+VARIANT = VariantOption(color='Blue', size=['M'], price=[999.0], availability=['InStock'])
+
+
+def test_a_finished_product_is_not_read_as_a_colour_page():
+    state = CrawlState(path=None)
+    state.add_pages('https://www.nnnow.com/cat', 'product', [(PRODUCT_B, LISTING_DATA)])
+    state.mark(PRODUCT_B, DONE, 'product')
+    # Product A lists product B's page as one of its colours; it must still be fetched as a colour page.
+    assert cached_variant(PRODUCT_B, state=state) is None
+
+
+def test_a_finished_colour_page_leaves_the_product_queued():
+    state = CrawlState(path=None)
+    state.add_pages('https://www.nnnow.com/cat', 'product', [(PRODUCT_B, LISTING_DATA)])
+    state.mark(PRODUCT_B, DONE, 'variant', payload=VARIANT.to_dict())
+    assert state.status(PRODUCT_B, 'product') == PENDING
+    assert state.children('https://www.nnnow.com/cat', 'product') == [(PRODUCT_B, PENDING, LISTING_DATA)]
+    assert cached_variant(PRODUCT_B, state=state) == VARIANT
+
+
+def test_a_page_is_given_up_on_after_max_attempts():
+    state = CrawlState(path=None)
+    state.add_pages('https://www.nnnow.com/cat', 'product', [(PRODUCT_B, LISTING_DATA)])
+    assert state.fail(PRODUCT_B, 'product', max_attempts=2) == PENDING
+    assert state.unfinished() == {'product': 1}
+    assert state.fail(PRODUCT_B, 'product', max_attempts=2) == FAILED
+    # A failed page needs no more work, so it doesn't keep the checkpoint alive.
+    assert state.unfinished() == {}
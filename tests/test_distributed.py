@@ -0,0 +1,40 @@
+# Tests for a distributed worker running product jobs from a SQLite work queue.
+import sqlite3
+import distributed
+from conftest import PageFetcher, PRODUCT_PAGE, product_url, queued_product
+from seen_index import SeenIndex
+from work_queue import SqliteWorkQueue, DONE, FAILED
+
+
+class CountingSeenIndex(SeenIndex):
+    """
+    A SeenIndex that remembers every instance created and whether it was closed.
+    """
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed = False
+        CountingSeenIndex.instances.append(self)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+def test_a_failed_product_is_given_back_and_the_worker_shares_one_closed_seen_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, 'SeenIndex', CountingSeenIndex)
+    queue_path = str(tmp_path / 'queue.db')
+    queue = SqliteWorkQueue(queue_path)
+    jobs = [(product_url(name), queued_product(name)) for name in ('product-a', 'product-b', 'broken')]
+    queue.put_many('product', jobs)
+    queue.close()
+    fetcher = PageFetcher({jobs[0][0]: PRODUCT_PAGE, jobs[1][0]: PRODUCT_PAGE})
+
+    distributed.run_worker(queue_path, output_path=str(tmp_path / 'data.db'), worker_id='test', fetcher=fetcher,
+                           requests_per_second=None, max_retries=0)
+
+    statuses = dict(sqlite3.connect(queue_path).execute("SELECT url, status FROM jobs").fetchall())
+    assert statuses == {jobs[0][0]: DONE, jobs[1][0]: DONE, jobs[2][0]: FAILED}
+    assert len(CountingSeenIndex.instances) == 1
+    assert CountingSeenIndex.instances[0].closed
@@ -0,0 +1,126 @@
+# Tests for the browser pool, using fake drivers instead of Chrome.
+import threading
+
+import pytest
+
+from driver_pool import DriverPool
+
+
+class FakeDriver:
+    """
+    Stands in for a WebDriver session. A crashed one fails the pool's health check.
+    """
+
+    def __init__(self, number):
+        self.number = number
+        self.crashed = False
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if self.crashed:
+            raise RuntimeError("browser crashed")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeDriverFactory:
+    """
+    Builds numbered FakeDrivers and remembers every one it built.
+    """
+
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(len(self.drivers))
+        self.drivers.append(driver)
+        return driver
+
+
+def test_a_browser_is_reused_and_then_recycled_after_max_pages():
+    factory = FakeDriverFactory()
+    pool = DriverPool(factory, size=1, max_pages_per_driver=2)
+
+    with pool.borrow() as first:
+        pass
+    with pool.borrow() as second:
+        pass
+    with pool.borrow() as third:
+        pass
+
+    assert first is second
+    assert first.quit_called
+    assert third is not first
+    assert len(factory.drivers) == 2
+
+
+def test_a_crashed_browser_is_replaced():
+    factory = FakeDriverFactory()
+    pool = DriverPool(factory, size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.borrow() as driver:
+            driver.crashed = True
+            raise RuntimeError("page failed")
+    with pool.borrow() as replacement:
+        pass
+
+    assert driver.quit_called
+    assert replacement is not driver
+
+
+def test_a_browser_that_survives_an_error_goes_back_to_the_pool():
+    factory = FakeDriverFactory()
+    pool = DriverPool(factory, size=1)
+
+    with pytest.raises(ValueError):
+        with pool.borrow() as driver:
+            raise ValueError("parse failed")
+    with pool.borrow() as again:
+        pass
+
+    assert again is driver
+    assert not driver.quit_called
+
+
+def test_a_waiting_caller_gets_a_new_browser_when_one_is_recycled():
+    factory = FakeDriverFactory()
+    pool = DriverPool(factory, size=1, max_pages_per_driver=1)
+    borrowed = []
+
+    def second_caller():
+        with pool.borrow(timeout=5) as driver:
+            borrowed.append(driver)
+
+    with pool.borrow() as first:
+        waiter = threading.Thread(target=second_caller)
+        waiter.start()
+        # Give the second caller time to start waiting for the only slot.
+        waiter.join(timeout=0.2)
+        assert waiter.is_alive()
+    # Returning the worn-out browser quits it; the waiter must be woken to start a fresh one.
+    waiter.join(timeout=5)
+
+    assert not waiter.is_alive()
+    assert borrowed and borrowed[0] is not first
+    assert first.quit_called
+
+
+def test_waiting_for_a_full_pool_times_out():
+    pool = DriverPool(FakeDriverFactory(), size=1)
+    with pool.borrow():
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.1)
+
+
+def test_close_quits_idle_browsers_and_refuses_new_borrows():
+    pool = DriverPool(FakeDriverFactory(), size=2)
+    with pool.borrow() as driver:
+        pass
+    pool.close()
+
+    assert driver.quit_called
+    with pytest.raises(RuntimeError):
+        pool.acquire()
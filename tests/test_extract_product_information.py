@@ -0,0 +1,69 @@
+# Tests for scraping the products of a listing page, using pages served from memory.
+import asyncio
+from conftest import ListSink, PageFetcher, PRODUCT_PAGE, listing_page, product_url, queued_product
+from crawl_scheduler import CrawlScheduler
+from crawl_state import CrawlState, DONE
+from extract_product_information import scrape_products, stream_product_data
+from freshness import FreshnessStore
+from records import VariantOption
+from seen_index import SeenIndex
+
+CATEGORY = 'https://www.nnnow.com/cat'
+PRODUCT_B = product_url('product-b')
+QUEUED_B = queued_product('product-b')
+
+
+async def stream(fetcher, state):
+    async with CrawlScheduler(fetcher, requests_per_second=None) as scheduler:
+        sink = ListSink()
+        written = await stream_product_data(CATEGORY, scheduler, sink=sink, state=state, batch_size=1)
+    return written, sink.records
+
+
+def test_a_product_already_fetched_as_a_colour_page_is_still_written():
+    state = CrawlState(path=None)
+    # Another product listed product B's page as one of its colours, and that colour page finished.
+    state.mark(PRODUCT_B, DONE, 'variant', payload=VariantOption(color='Blue').to_dict())
+    fetcher = PageFetcher({CATEGORY: listing_page('product-b'), PRODUCT_B: PRODUCT_PAGE})
+
+    written, records = asyncio.run(stream(fetcher, state))
+
+    assert written == 1
+    assert [record.link for record in records] == ['www.nnnow.com/product-b']
+    assert (PRODUCT_B, 'product') in fetcher.fetched
+    assert state.status(PRODUCT_B, 'product') == DONE
+
+
+async def scrape(fetcher, **stores):
+    async with CrawlScheduler(fetcher, requests_per_second=None, max_retries=0) as scheduler:
+        sink = ListSink()
+        products = await scrape_products([QUEUED_B], scheduler, sink=sink, **stores)
+    return products, sink.records
+
+
+def test_a_product_page_that_fails_is_not_recorded_anywhere():
+    seen_index = SeenIndex(path=None)
+    freshness = FreshnessStore(path=':memory:')
+    state = CrawlState(path=None)
+    state.add_pages(CATEGORY, 'product', [(PRODUCT_B, QUEUED_B)])
+
+    products, records = asyncio.run(scrape(PageFetcher({}), seen_index=seen_index, freshness=freshness, state=state))
+
+    # No record with empty details, and nothing that would stop the next run from trying again.
+    assert products == [] and records == []
+    assert 'product-b' not in seen_index
+    assert freshness.check('product-b', 'product-b') == 'new'
+    assert state.status(PRODUCT_B, 'product') != DONE
+
+
+def test_a_loaded_product_page_is_written_and_marked_done():
+    seen_index = SeenIndex(path=None)
+    state = CrawlState(path=None)
+    state.add_pages(CATEGORY, 'product', [(PRODUCT_B, QUEUED_B)])
+
+    products, records = asyncio.run(scrape(PageFetcher({PRODUCT_B: PRODUCT_PAGE}), seen_index=seen_index, state=state))
+
+    assert records == products and len(products) == 1
+    assert products[0].variant_options == [VariantOption(color='Blue', size=['M'], price=[999.0], availability=['InStock'])]
+    assert 'product-b' in seen_index
+    assert state.status(PRODUCT_B, 'product') == DONE
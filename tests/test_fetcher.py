@@ -0,0 +1,108 @@
+# Tests for the plain-HTTP fetch backend and its browser fallback, against a local fixture HTTP server.
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetcher import Fetcher, HttpFetcher, SiteFetcher
+
+# The pages the fixture server knows. Anything else is a 404.
+PAGES = {
+    # A colour page rendered on the server: it has the size chips the variant page type needs.
+    '/variant-rendered': '<html><body><span class="nw-color-name">Blue</span>'
+                         '<button class="nwc-btn nw-size-chip">M</button></body></html>',
+    # A colour page that only renders its content with JavaScript.
+    '/variant-empty': '<html><body><div id="root"></div><script src="/app.js"></script></body></html>',
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Keep the test output quiet.
+        pass
+
+
+class StubBrowserFetcher(Fetcher):
+    """
+    Stands in for the Selenium fetcher and remembers which pages it was asked for.
+    """
+
+    def __init__(self):
+        self.fetched = []
+
+    def fetch(self, url, page_type):
+        self.fetched.append(url)
+        return '<html><body><button class="nwc-btn nw-size-chip">L</button></body></html>'
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_fetcher_returns_the_page(server_url):
+    fetcher = HttpFetcher(timeout=5)
+    try:
+        assert fetcher.fetch(f"{server_url}/variant-rendered", 'variant') == PAGES['/variant-rendered']
+    finally:
+        fetcher.close()
+
+
+def test_http_fetcher_returns_none_for_a_non_200_response(server_url):
+    fetcher = HttpFetcher(timeout=5)
+    try:
+        assert fetcher.fetch(f"{server_url}/no-such-page", 'variant') is None
+    finally:
+        fetcher.close()
+
+
+def test_site_fetcher_keeps_server_rendered_pages(server_url):
+    browser = StubBrowserFetcher()
+    fetcher = SiteFetcher(backends={'variant': 'http'}, http_fetcher=HttpFetcher(timeout=5), browser_fetcher=browser)
+    try:
+        assert fetcher.fetch(f"{server_url}/variant-rendered", 'variant') == PAGES['/variant-rendered']
+        assert browser.fetched == []
+    finally:
+        fetcher.close()
+
+
+def test_site_fetcher_falls_back_to_the_browser_when_selectors_are_missing(server_url):
+    browser = StubBrowserFetcher()
+    fetcher = SiteFetcher(backends={'variant': 'http'}, http_fetcher=HttpFetcher(timeout=5), browser_fetcher=browser)
+    try:
+        html_content = fetcher.fetch(f"{server_url}/variant-empty", 'variant')
+        assert 'nw-size-chip' in html_content
+        assert browser.fetched == [f"{server_url}/variant-empty"]
+    finally:
+        fetcher.close()
+
+
+def test_site_fetcher_sends_only_the_missing_pages_of_a_batch_to_the_browser(server_url):
+    browser = StubBrowserFetcher()
+    fetcher = SiteFetcher(backends={'variant': 'http'}, http_fetcher=HttpFetcher(timeout=5), browser_fetcher=browser)
+    urls = [f"{server_url}/variant-rendered", f"{server_url}/variant-empty", f"{server_url}/no-such-page"]
+    try:
+        results = fetcher.fetch_many(urls, 'variant')
+        assert results[0] == PAGES['/variant-rendered']
+        assert all('nw-size-chip' in html_content for html_content in results)
+        assert browser.fetched == urls[1:]
+    finally:
+        fetcher.close()
@@ -0,0 +1,18 @@
+# Tests for the live Prometheus endpoint.
+import urllib.request
+from metrics import Metrics, serve_prometheus
+
+
+def test_the_endpoint_listens_on_localhost_only_by_default():
+    metrics = Metrics()
+    metrics.increment('pages_loaded')
+    server = serve_prometheus(0, metrics=metrics)
+    try:
+        host, port = server.server_address
+        assert host == '127.0.0.1'
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.status == 200
+            assert 'pages_loaded' in response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,42 @@
+# Tests for the crawl's checkpoint handling across runs, using pages served from memory.
+from conftest import HOME, PageFetcher, PRODUCT_PAGE, home_page, listing_page, product_url
+from crawl_state import CrawlState, MAX_ATTEMPTS
+from navigator import navigate_to_page
+
+CATEGORIES = ['https://www.nnnow.com/cat-0', 'https://www.nnnow.com/cat-1']
+
+
+def crawl(fetcher, tmp_path):
+    navigate_to_page(fetcher=fetcher, requests_per_second=None, max_retries=0, output_path=str(tmp_path / 'data.jsonl'),
+                     json_export_path=None, metrics_path=None, seen_index_path=None,
+                     state_path=str(tmp_path / 'crawl_state.db'))
+
+
+def test_a_finished_test_run_loads_the_homepage_again_next_time(tmp_path):
+    pages = {HOME: home_page(*CATEGORIES), CATEGORIES[0]: listing_page('product-a'), product_url('product-a'): PRODUCT_PAGE}
+    first, second = PageFetcher(pages), PageFetcher(pages)
+
+    crawl(first, tmp_path)
+    # The categories skipped by the testing limit don't keep the checkpoint alive.
+    assert len(CrawlState(str(tmp_path / 'crawl_state.db'))) == 0
+    crawl(second, tmp_path)
+
+    assert (HOME, 'home') in first.fetched
+    assert (HOME, 'home') in second.fetched
+    assert (CATEGORIES[1], 'listing') not in first.fetched + second.fetched
+
+
+def test_a_product_that_always_fails_is_given_up_on(tmp_path):
+    # product-b is listed but its page never loads.
+    pages = {HOME: home_page(*CATEGORIES), CATEGORIES[0]: listing_page('product-a', 'product-b'),
+             product_url('product-a'): PRODUCT_PAGE}
+    runs = [PageFetcher(pages) for _ in range(MAX_ATTEMPTS + 1)]
+
+    for fetcher in runs:
+        crawl(fetcher, tmp_path)
+
+    # Every run but the first resumes the category and retries only the broken product...
+    for fetcher in runs[1:MAX_ATTEMPTS]:
+        assert fetcher.fetched == [(product_url('product-b'), 'product')]
+    # ...until it is given up on, the checkpoint clears and the next run starts from the homepage again.
+    assert (HOME, 'home') in runs[-1].fetched
@@ -0,0 +1,64 @@
+# Tests for the JSONL writer and the export to a single JSON array.
+import json
+
+from output_sink import JsonlSink, export_json
+
+
+def lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_records_reach_the_file_once_per_batch(tmp_path):
+    path = str(tmp_path / 'data.jsonl')
+    sink = JsonlSink(path, batch_size=2)
+
+    sink.write({'id': 'a'})
+    assert lines(path) == []
+    sink.write({'id': 'b'})
+    assert [json.loads(line) for line in lines(path)] == [{'id': 'a'}, {'id': 'b'}]
+
+    sink.write({'id': 'c'})
+    assert len(lines(path)) == 2
+    sink.close()
+    assert [json.loads(line)['id'] for line in lines(path)] == ['a', 'b', 'c']
+
+
+def test_flush_writes_a_partial_batch(tmp_path):
+    path = str(tmp_path / 'data.jsonl')
+    with JsonlSink(path, batch_size=50) as sink:
+        sink.write({'id': 'a'})
+        sink.flush()
+        assert [json.loads(line) for line in lines(path)] == [{'id': 'a'}]
+
+
+def test_a_line_cut_off_by_a_crash_does_not_merge_with_new_records(tmp_path):
+    path = tmp_path / 'data.jsonl'
+    path.write_text('{"id": "a"}\n{"id": "b', encoding='utf-8')
+
+    with JsonlSink(str(path)) as sink:
+        sink.write({'id': 'c'})
+
+    assert lines(str(path)) == ['{"id": "a"}', '{"id": "b', '{"id": "c"}']
+
+
+def test_export_json_writes_an_array_and_skips_unreadable_lines(tmp_path):
+    jsonl_path = tmp_path / 'data.jsonl'
+    jsonl_path.write_text('{"id": "a"}\n\n{"id": "b"}\n{"id": "c', encoding='utf-8')
+    json_path = str(tmp_path / 'data.json')
+
+    count = export_json(str(jsonl_path), json_path)
+
+    assert count == 2
+    with open(json_path, encoding='utf-8') as f:
+        assert json.load(f) == [{'id': 'a'}, {'id': 'b'}]
+
+
+def test_export_json_of_an_empty_file_is_an_empty_array(tmp_path):
+    jsonl_path = tmp_path / 'data.jsonl'
+    jsonl_path.write_text('', encoding='utf-8')
+    json_path = str(tmp_path / 'data.json')
+
+    assert export_json(str(jsonl_path), json_path) == 0
+    with open(json_path, encoding='utf-8') as f:
+        assert json.load(f) == []
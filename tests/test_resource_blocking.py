@@ -0,0 +1,20 @@
+# Tests for the URL patterns the browser is told to block.
+from fnmatch import fnmatchcase
+
+from resource_blocking import blocked_patterns
+
+
+def is_blocked(url, page_type):
+    # Chrome's blocked-URL patterns match the whole URL, with '*' standing for anything, like fnmatch.
+    return any(fnmatchcase(url, pattern) for pattern in blocked_patterns(page_type))
+
+
+def test_images_with_a_query_string_are_blocked():
+    assert is_blocked('https://cdn.nnnow.com/img.jpg', 'listing')
+    assert is_blocked('https://cdn.nnnow.com/img.jpg?w=400', 'listing')
+    assert is_blocked('https://cdn.nnnow.com/font.woff2#v3', 'listing')
+
+
+def test_product_pages_keep_their_images_and_pages_are_never_blocked():
+    assert not is_blocked('https://cdn.nnnow.com/img.jpg?w=400', 'product')
+    assert not is_blocked('https://www.nnnow.com/men-shirts', 'listing')
@@ -0,0 +1,75 @@
+# Tests for the on-disk page cache: staleness, least-recently-used eviction and shared page files.
+import itertools
+import os
+import random
+import string
+
+import response_cache
+from response_cache import ResponseCache
+
+
+def page(seed, length=4000):
+    """
+    A page of random text, so each one compresses to roughly the same size and none share content.
+    """
+    letters = random.Random(seed)
+    return "<html><body>" + "".join(letters.choice(string.ascii_letters) for _ in range(length)) + "</body></html>"
+
+
+def stored_files(directory):
+    return [name for _, _, names in os.walk(os.path.join(directory, 'pages')) for name in names]
+
+
+def test_a_stale_entry_is_only_served_when_allowed(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_seconds=0)
+    cache.put('https://www.nnnow.com/a', 'product', page(1))
+
+    assert cache.get('https://www.nnnow.com/a', 'product') is None
+    assert cache.get('https://www.nnnow.com/a', 'product', allow_stale=True) == page(1)
+    cache.close()
+
+
+def test_a_fresh_entry_is_served_for_its_own_page_type_only(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put('https://www.nnnow.com/a', 'product', page(1))
+
+    assert cache.get('https://www.nnnow.com/a', 'product') == page(1)
+    assert cache.get('https://www.nnnow.com/a', 'listing') is None
+    cache.close()
+
+
+def test_the_least_recently_used_entry_is_evicted_first(tmp_path, monkeypatch):
+    # A clock that always moves forward, so every put and get has its own last-used time.
+    clock = itertools.count(1000)
+    monkeypatch.setattr(response_cache.time, 'time', lambda: next(clock))
+    cache = ResponseCache(str(tmp_path))
+    cache.put('https://www.nnnow.com/a', 'product', page(1))
+    cache.put('https://www.nnnow.com/b', 'product', page(2))
+    # Room for about two pages, so the third put has to evict one.
+    cache.max_bytes = cache.stats()['bytes'] * 5 // 4
+    cache.get('https://www.nnnow.com/a', 'product')
+
+    cache.put('https://www.nnnow.com/c', 'product', page(3))
+
+    assert cache.get('https://www.nnnow.com/b', 'product') is None
+    assert cache.get('https://www.nnnow.com/a', 'product') == page(1)
+    assert cache.get('https://www.nnnow.com/c', 'product') == page(3)
+    assert cache.stats()['entries'] == 2
+    assert len(stored_files(str(tmp_path))) == 2
+    cache.close()
+
+
+def test_identical_pages_share_one_stored_file(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put('https://www.nnnow.com/a', 'product', page(1))
+    single = cache.stats()['bytes']
+    cache.put('https://www.nnnow.com/a?ref=home', 'product', page(1))
+
+    assert cache.stats() == {'entries': 2, 'bytes': single}
+    assert len(stored_files(str(tmp_path))) == 1
+
+    # The file stays until the last entry using it is replaced.
+    cache.put('https://www.nnnow.com/a', 'product', page(2))
+    assert cache.get('https://www.nnnow.com/a?ref=home', 'product') == page(1)
+    assert len(stored_files(str(tmp_path))) == 2
+    cache.close()
@@ -0,0 +1,33 @@
+# Tests for reading the readiness selectors and parse regions from a site profile.
+from fetcher import has_required_content
+from page_readiness import get_readiness_profile
+from site_profile import ExtractionPlan
+
+PROFILE = {
+    'name': 'shop',
+    'base_url': 'https://shop.example',
+    'navigation_link': {'tag': 'a', 'class': ['menu-link']},
+    'listing': {'tag': 'li', 'class': ['product-card']},
+    'fields': {'title': {'tag': 'h2'}},
+}
+
+
+def test_home_and_listing_wait_for_the_profile_elements_by_default():
+    plan = ExtractionPlan(PROFILE)
+    assert plan.ready_selectors('home') == ['a.menu-link']
+    assert plan.ready_selectors('listing') == ['li.product-card']
+    assert get_readiness_profile('listing', plan).selectors == ['li.product-card']
+    assert get_readiness_profile('listing', plan).scroll
+
+
+def test_readiness_selectors_come_from_the_profile():
+    plan = ExtractionPlan(dict(PROFILE, readiness={'variant': ['.nw-color-name']}))
+    assert get_readiness_profile('variant', plan).selectors == ['.nw-color-name']
+    assert has_required_content('<div><span class="nw-color-name">Blue</span></div>', 'variant', plan)
+    assert not has_required_content('<div><button class="nw-size-chip">M</button></div>', 'variant', plan)
+
+
+def test_listing_content_is_checked_within_the_profile_regions():
+    plan = ExtractionPlan(PROFILE)
+    assert has_required_content('<ul><li class="product-card"><h2>Shirt</h2></li></ul>', 'listing', plan)
+    assert not has_required_content('<div class="nw-productlist-eachproduct"></div>', 'listing', plan)
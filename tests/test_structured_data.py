@@ -0,0 +1,28 @@
+# Tests for reading product details from a page's JSON-LD.
+import json
+from structured_data import read_structured_product
+
+PAGE_URL = 'https://www.nnnow.com/product-a'
+
+
+def page(*items):
+    scripts = "".join(f'<script type="application/ld+json">{json.dumps(item)}</script>' for item in items)
+    return f"<html><head>{scripts}</head><body></body></html>"
+
+
+def breadcrumbs(*names):
+    return {'@type': 'BreadcrumbList',
+            'itemListElement': [{'@type': 'ListItem', 'position': position, 'name': name}
+                                for position, name in enumerate(names, start=1)]}
+
+
+def test_gender_comes_from_the_third_breadcrumb():
+    structured = read_structured_product(page({'@type': 'Product', 'name': 'Shirt'}, breadcrumbs('Home', 'Men', 'Shirts')), PAGE_URL)
+    assert structured['product_category'] == 'Home > Men > Shirts > '
+    assert structured['gender'] == 'Shirts'
+
+
+def test_a_short_breadcrumb_trail_gives_no_gender():
+    structured = read_structured_product(page({'@type': 'Product', 'name': 'Shirt'}, breadcrumbs('Home', 'Men')), PAGE_URL)
+    assert structured['product_category'] == 'Home > Men > '
+    assert structured['gender'] is None
@@ -0,0 +1,218 @@
+# Import necessary libraries for sharing crawl work between several processes or machines.
+import logging  # Used for levelled progress and error messages.
+import json  # Used to store each job's payload.
+import sqlite3  # A small on-disk database that ships with Python.
+import threading  # Used so several threads in one worker can share a queue safely.
+import time  # Used for job leases.
+
+logger = logging.getLogger(__name__)
+
+# The status a job moves through.
+PENDING = 'pending'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    """
+    The common interface for a shared crawl queue. Each job is a URL with a page type ('listing' or
+    'product') and a JSON payload. A URL is only ever queued once, so a product listed under several
+    categories is scraped by one worker only.
+    """
+
+    def put_many(self, page_type, jobs):
+        """
+        Queues jobs given as (url, payload) pairs. URLs that were queued before are ignored.
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id, limit=1):
+        """
+        Atomically hands up to limit pending jobs to one worker, as (url, page_type, payload) tuples.
+        Two workers never get the same job.
+        """
+        raise NotImplementedError
+
+    def complete(self, url):
+        raise NotImplementedError
+
+    def fail(self, url, max_attempts=3):
+        """
+        Gives a job back after an error. It is retried until it has failed max_attempts times.
+        """
+        raise NotImplementedError
+
+    def unfinished(self):
+        """
+        Returns how many jobs are still pending or claimed.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SqliteWorkQueue(WorkQueue):
+    """
+    A work queue in a SQLite file that every worker process on the machine (or on a shared disk) opens.
+    Claims run in a write transaction, so they are atomic across processes. A claimed job whose worker
+    died is handed out again once its lease runs out.
+    """
+
+    def __init__(self, path='work_queue.db', lease_seconds=15 * 60):
+        self.path = path
+        # How long a worker may hold a job before it is considered lost.
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        # isolation_level=None lets us open the claim transaction ourselves with BEGIN IMMEDIATE.
+        # The timeout makes other processes wait for the lock instead of failing straight away.
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        # WAL lets readers carry on while another process writes.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (url TEXT PRIMARY KEY, page_type TEXT, payload TEXT, status TEXT, "
+            "worker TEXT, claimed_at REAL, attempts INTEGER DEFAULT 0)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, page_type)")
+
+    def put_many(self, page_type, jobs):
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO jobs (url, page_type, payload, status) VALUES (?, ?, ?, ?)",
+                    [(url, page_type, json.dumps(payload), PENDING) for url, payload in jobs]
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker_id, limit=1):
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so no other process can claim the same rows.
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Products first, so the work already discovered is finished before more listings are opened.
+                rows = self._connection.execute(
+                    "SELECT url, page_type, payload FROM jobs "
+                    "WHERE status = ? OR (status = ? AND claimed_at < ?) "
+                    "ORDER BY CASE page_type WHEN 'product' THEN 0 ELSE 1 END, rowid LIMIT ?",
+                    (PENDING, CLAIMED, now - self.lease_seconds, limit)
+                ).fetchall()
+                self._connection.executemany(
+                    "UPDATE jobs SET status = ?, worker = ?, claimed_at = ? WHERE url = ?",
+                    [(CLAIMED, worker_id, now, url) for url, _, _ in rows]
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        return [(url, page_type, json.loads(payload)) for url, page_type, payload in rows]
+
+    def complete(self, url):
+        with self._lock:
+            self._connection.execute("UPDATE jobs SET status = ? WHERE url = ?", (DONE, url))
+
+    def fail(self, url, max_attempts=3):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET attempts = attempts + 1, "
+                "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE url = ?",
+                (max_attempts, FAILED, PENDING, url)
+            )
+
+    def unfinished(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, CLAIMED)
+            ).fetchone()[0]
+
+    def counts(self):
+        """
+        Counts the jobs in each status, e.g. {'pending': 120, 'claimed': 8, 'done': 40}.
+        """
+        with self._lock:
+            return dict(self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class RedisWorkQueue(WorkQueue):
+    """
+    A work queue on a Redis (or Redis-compatible) server, for workers spread over several machines.
+    Requires the optional 'redis' package. Jobs that a crashed worker held are not handed out again
+    automatically; run requeue_claimed() from the coordinator to put them back.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', name='scraper'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("RedisWorkQueue needs the 'redis' package. Install it with: pip install redis")
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        # Every key this queue uses starts with the queue's name.
+        self._seen = f"{name}:seen"
+        self._pending = {'product': f"{name}:pending:product", 'listing': f"{name}:pending:listing"}
+        self._claimed = f"{name}:claimed"
+        self._jobs = f"{name}:jobs"
+        self._attempts = f"{name}:attempts"
+
+    def put_many(self, page_type, jobs):
+        for url, payload in jobs:
+            # SADD returns 0 for a URL that was queued before.
+            if self._redis.sadd(self._seen, url):
+                self._redis.hset(self._jobs, url, json.dumps({'page_type': page_type, 'payload': payload}))
+                self._redis.lpush(self._pending.get(page_type, self._pending['listing']), url)
+
+    def claim(self, worker_id, limit=1):
+        claimed = []
+        # Products first, so the work already discovered is finished before more listings are opened.
+        for pending in (self._pending['product'], self._pending['listing']):
+            while len(claimed) < limit:
+                # LMOVE pops and records the claim in one atomic step.
+                url = self._redis.lmove(pending, self._claimed, 'RIGHT', 'LEFT')
+                if url is None:
+                    break
+                job = json.loads(self._redis.hget(self._jobs, url))
+                claimed.append((url, job['page_type'], job['payload']))
+        return claimed
+
+    def complete(self, url):
+        self._redis.lrem(self._claimed, 1, url)
+
+    def fail(self, url, max_attempts=3):
+        self._redis.lrem(self._claimed, 1, url)
+        if self._redis.hincrby(self._attempts, url, 1) < max_attempts:
+            page_type = json.loads(self._redis.hget(self._jobs, url))['page_type']
+            self._redis.lpush(self._pending.get(page_type, self._pending['listing']), url)
+
+    def requeue_claimed(self):
+        """
+        Puts every claimed job back in its pending list. Only run this while no worker is running.
+        """
+        while True:
+            url = self._redis.rpop(self._claimed)
+            if url is None:
+                break
+            page_type = json.loads(self._redis.hget(self._jobs, url))['page_type']
+            self._redis.lpush(self._pending.get(page_type, self._pending['listing']), url)
+
+    def unfinished(self):
+        return sum(self._redis.llen(key) for key in self._pending.values()) + self._redis.llen(self._claimed)
+
+    def close(self):
+        self._redis.close()
+
+
+def open_work_queue(location):
+    """
+    Opens the queue at a location: a redis:// (or rediss://) URL, or the path of a SQLite file.
+    """
+    if location.startswith(('redis://', 'rediss://')):
+        return RedisWorkQueue(location)
+    return SqliteWorkQueue(location)